@@ -0,0 +1,73 @@
+"""
+Parity check and latency benchmark for compact_forest.CompactForest.
+
+Trains (or loads) the crop RandomForest, exports it to flat node arrays,
+verifies that compact probabilities match sklearn's predict_proba on seeded
+random inputs, and times both engines across batch sizes. Exits non-zero if
+parity fails, so it doubles as a regression check.
+
+Usage:
+    python benchmarks/bench_compact_forest.py
+    python benchmarks/bench_compact_forest.py --batches 1 16 64 256 --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_forest import max_parity_error  # noqa: E402
+from crop_recommendation import CropRecommendationSystem  # noqa: E402
+
+
+def mean_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact forest parity and latency benchmark')
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 8, 32, 64, 128, 512])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--parity-samples', type=int, default=5000)
+    parser.add_argument('--tolerance', type=float, default=1e-12)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    recommender = CropRecommendationSystem(inference='compact')
+    forest, compact = recommender.model, recommender.compact
+    rng = np.random.default_rng(opts.seed)
+
+    # Probe well inside and outside the training distribution (inputs are already scaled)
+    X = rng.normal(scale=2.0, size=(opts.parity_samples, len(recommender.scaler.mean_)))
+    error = max_parity_error(compact, forest, X)
+    print(json.dumps({
+        'parity_samples': opts.parity_samples,
+        'max_abs_error': error,
+        'trees': compact.n_trees,
+        'nodes': int(len(compact.feature)),
+        'max_depth': compact.max_depth,
+        'memmapped': isinstance(compact.value, np.memmap)
+    }))
+
+    for n in opts.batches:
+        batch = X[:n]
+        print(json.dumps({
+            'batch': n,
+            'sklearn_ms': round(mean_ms(lambda: forest.predict_proba(batch), opts.repeat), 3),
+            'compact_ms': round(mean_ms(lambda: compact.predict_proba(batch), opts.repeat), 3)
+        }))
+
+    if error > opts.tolerance:
+        print(f'FAIL parity error {error} exceeds {opts.tolerance}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
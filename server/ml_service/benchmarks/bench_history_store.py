@@ -0,0 +1,68 @@
+"""
+Benchmark the memory-mapped sales history store against inline JSON history.
+
+For each history length, stores one product's daily sales and times a stock
+prediction that ships the history inline (JSON decode + parse_sales_history)
+against one that names it by history_id, plus a 90-day range read against a
+full read of the stored series. Prints one JSON line per history length.
+
+Usage:
+    python benchmarks/bench_history_store.py
+    python benchmarks/bench_history_store.py --days 365 3650 36500 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark stored vs inline sales history')
+    parser.add_argument('--days', type=int, nargs='+', default=[365, 3650, 20000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench-history-') as root:
+        # Must be set before stock_prediction creates its store
+        os.environ['ML_SALES_HISTORY_DIR'] = root
+        import stock_prediction as sp
+
+        rng = np.random.default_rng(opts.seed)
+        for n_days in opts.days:
+            history_id = f'sku-{n_days}'
+            dates = pd.date_range(end='2025-06-30', periods=n_days, freq='D').strftime('%Y-%m-%d').tolist()
+            sold = rng.poisson(5, n_days).astype(float).tolist()
+            sp.ingest_sales(history_id, {'dates': dates, 'sold': sold})
+            base = {'product_name': history_id, 'current_stock': 500, 'days_ahead': 30, 'trend_model': 'closed_form'}
+            inline = json.dumps({**base, 'sales_history': {'dates': dates, 'sold': sold}})
+            by_id = json.dumps({**base, 'history_id': history_id})
+            print(json.dumps({
+                'days': n_days,
+                'inline_payload_kb': round(len(inline) / 1024, 1),
+                'inline_predict_ms': best_ms(lambda: sp._predict_stock(json.loads(inline)), opts.repeat),
+                'by_id_predict_ms': best_ms(lambda: sp._predict_stock(json.loads(by_id)), opts.repeat),
+                'full_read_ms': best_ms(lambda: sp.sales_store.read(history_id), opts.repeat),
+                'range_90d_read_ms': best_ms(lambda: sp.sales_store.read(history_id, '2025-04-01', '2025-06-29'),
+                                             opts.repeat)
+            }), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Latency/throughput trade-off of the micro-batching front end.
+
+Fires --requests crop predict requests from --concurrency concurrent callers
+at an in-process BatchingFrontend for each (batch size, max wait) setting, and
+at the plain ModelServer.dispatch (one request per call) as a baseline.
+Prints p50/p99 latency and throughput per setting as JSON lines.
+
+Usage:
+    python benchmarks/bench_micro_batching.py
+    python benchmarks/bench_micro_batching.py --concurrency 64 --batch-sizes 8 32 128 --waits-ms 1 5 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_recommendation import SOIL_FEATURES  # noqa: E402
+from micro_batching import BatchingFrontend  # noqa: E402
+from model_server import ModelServer  # noqa: E402
+
+
+def make_requests(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    low = np.array([0, 5, 5, 10, 20, 4.5, 30], dtype=float)
+    high = np.array([140, 145, 205, 40, 95, 8.5, 280], dtype=float)
+    return [dict(zip(SOIL_FEATURES, row.tolist())) for row in rng.uniform(low, high, size=(n, len(SOIL_FEATURES)))]
+
+
+async def drive(call, samples, concurrency: int):
+    latencies = []
+    queue = list(samples)
+
+    async def worker():
+        while queue:
+            sample = queue.pop()
+            start = time.perf_counter()
+            await call(sample)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def report(label: str, latencies, elapsed: float):
+    ms = np.asarray(latencies) * 1000
+    print(json.dumps({
+        'mode': label,
+        'requests': len(latencies),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 1)
+    }), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark micro-batched crop predictions')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--waits-ms', type=float, nargs='+', default=[0, 2, 10])
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    # Distinct samples and no cache, so every request really reaches the model
+    server = ModelServer()
+    server.recommender.cache.maxsize = 0
+    samples = make_requests(opts.requests, opts.seed)
+
+    async def unbatched():
+        frontend = BatchingFrontend(server)
+        call = lambda sample: frontend._run(server.dispatch, 'crop', ['predict', sample])  # noqa: E731
+        return await drive(call, samples, opts.concurrency)
+
+    report('unbatched', *asyncio.run(unbatched()))
+
+    for size in opts.batch_sizes:
+        for wait in opts.waits_ms:
+            async def batched():
+                frontend = BatchingFrontend(server, max_batch_size=size, max_wait_ms=wait)
+                call = lambda sample: frontend.dispatch('crop', ['predict', sample])  # noqa: E731
+                try:
+                    return await drive(call, samples, opts.concurrency)
+                finally:
+                    for batcher in frontend.batchers.values():
+                        batcher.close()
+
+            report(f'batch={size} wait={wait}ms', *asyncio.run(batched()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory check for prefork_server.py: does the pool stay flat as workers are added?
+
+For each worker count, starts a pre-fork server on a temporary UNIX socket,
+spreads crop and price predictions over many connections so every worker
+serves traffic, then reads per-process RSS/PSS/private memory through the
+`memory` command. Total PSS is the pool's real footprint; it is printed next
+to an estimate for the same number of independent model_server.py
+processes (workers x (parent RSS + one worker's private memory)).
+
+With --check, exits non-zero if adding a worker costs more than
+--max-growth of the single-worker pool's PSS on average, so it can gate CI
+(Linux only: relies on /proc/<pid>/smaps_rollup).
+
+Usage:
+    python benchmarks/bench_prefork_memory.py
+    python benchmarks/bench_prefork_memory.py --workers 1 2 4 8 --requests 400 --check
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CROP_SAMPLE = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.9, 'humidity': 82, 'ph': 6.5, 'rainfall': 203}
+
+
+def call(path: str, requests):
+    """Send requests on one connection and return the decoded results in order."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        stream = sock.makefile('rw')
+        results = []
+        for request in requests:
+            stream.write(json.dumps(request) + '\n')
+            stream.flush()
+            results.append(json.loads(stream.readline())['result'])
+        return results
+
+
+def exercise(path: str, connections: int, per_connection: int):
+    for c in range(connections):
+        batch = []
+        for i in range(per_connection):
+            sample = dict(CROP_SAMPLE, N=float((c * per_connection + i) % 140))
+            batch.append({'id': i, 'service': 'crop', 'args': ['predict', sample]})
+            batch.append({'id': i, 'service': 'price', 'args': ['predict', ['rice', 'wheat', 'onions'][i % 3], 7 + i % 90]})
+        for result in call(path, batch):
+            if not result.get('success'):
+                raise RuntimeError(f'request failed: {result}')
+
+
+def start(argv, env):
+    proc = subprocess.Popen(argv, cwd=ML_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    ready = json.loads(proc.stdout.readline())
+    if not ready.get('result', {}).get('success'):
+        proc.kill()
+        raise RuntimeError(f'server failed to start: {ready}')
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-fork server memory per worker count')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per worker count')
+    parser.add_argument('--check', action='store_true', help='Exit 1 if memory grows too fast with workers')
+    parser.add_argument('--max-growth', type=float, default=0.25,
+                        help='Allowed average PSS added per extra worker, as a fraction of the 1-worker pool')
+    opts = parser.parse_args()
+
+    env = dict(os.environ)
+    reports = []
+    with tempfile.TemporaryDirectory(prefix='bench-prefork-') as tmp:
+        env.setdefault('ML_MODELS_DIR', os.path.join(tmp, 'models'))
+        standalone_rss = None
+        for workers in opts.workers:
+            path = os.path.join(tmp, f'ml-{workers}.sock')
+            proc = start([sys.executable, 'prefork_server.py', '--workers', str(workers), '--unix', path], env)
+            try:
+                connections = max(workers * 4, 8)
+                exercise(path, connections, max(1, opts.requests // (2 * connections)))
+                memory = call(path, [{'args': ['memory']}])[0]
+            finally:
+                proc.terminate()
+                proc.wait()
+            worker_stats = [p for p in memory['processes'] if p['role'] == 'worker']
+            parent = next(p for p in memory['processes'] if p['role'] == 'parent')
+            if standalone_rss is None:
+                # A stand-alone server holds what the parent holds plus one worker's working set
+                standalone_rss = parent['rss_mb'] + (worker_stats[0]['private_mb'] if worker_stats else 0.0)
+            report = {
+                'workers': workers,
+                'total_pss_mb': memory['total_pss_mb'],
+                'parent_rss_mb': parent['rss_mb'],
+                'worker_rss_mb': [w['rss_mb'] for w in worker_stats],
+                'worker_private_mb': [w['private_mb'] for w in worker_stats],
+                'independent_processes_mb': round(standalone_rss * workers, 1)
+            }
+            reports.append(report)
+            print(json.dumps(report), flush=True)
+
+    if opts.check and len(reports) > 1:
+        base = reports[0]
+        last = reports[-1]
+        extra_workers = last['workers'] - base['workers']
+        per_worker = (last['total_pss_mb'] - base['total_pss_mb']) / extra_workers if extra_workers else 0.0
+        budget = opts.max_growth * base['total_pss_mb']
+        print(json.dumps({'pss_per_extra_worker_mb': round(per_worker, 1), 'budget_mb': round(budget, 1)}))
+        if per_worker > budget:
+            print(f'FAIL each extra worker adds {per_worker:.1f} MB PSS (budget {budget:.1f} MB)', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Cold-start benchmark for synthetic price-history generation.
+
+Times price_prediction.generate_price_history over a grid of crop counts and
+date ranges and prints one JSON line per configuration.
+
+Usage:
+    python benchmarks/bench_price_history.py
+    python benchmarks/bench_price_history.py --crops 5 50 500 --years 1 2 5 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_prediction import generate_price_history  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark synthetic price-history generation')
+    parser.add_argument('--crops', type=int, nargs='+', default=[5, 50, 200, 500])
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 2, 5])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    for n_crops in opts.crops:
+        crops = [f'crop_{i}' for i in range(n_crops)]
+        for years in opts.years:
+            end_date = f'{2024 + years - 1}-12-31'
+            timings = []
+            for _ in range(opts.repeat):
+                start = time.perf_counter()
+                df = generate_price_history(crops, '2024-01-01', end_date, seed=opts.seed)
+                timings.append(time.perf_counter() - start)
+            print(json.dumps({
+                'crops': n_crops,
+                'years': years,
+                'rows': len(df),
+                'best_ms': round(min(timings) * 1000, 3),
+                'mean_ms': round(sum(timings) / len(timings) * 1000, 3)
+            }))
+
+
+if __name__ == '__main__':
+    main()
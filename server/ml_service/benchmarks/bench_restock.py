@@ -0,0 +1,67 @@
+"""
+Benchmark the batch restock planner against one predict_stock call per listing.
+
+Builds --items listings with random sales histories, lead times and safety
+stock, then times plan_restock over the whole inventory against calling
+_predict_stock (closed-form trend, the planner's forecast) for each listing,
+which only answers the stockout date. Prints one JSON line per inventory size.
+
+Usage:
+    python benchmarks/bench_restock.py
+    python benchmarks/bench_restock.py --items 100 500 2000 --history-days 180
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_prediction import _predict_stock, plan_restock  # noqa: E402
+
+
+def make_items(n: int, history_days: int, seed: int):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end='2025-06-30', periods=history_days, freq='D').strftime('%Y-%m-%d').tolist()
+    return [{
+        'product_name': f'listing-{i}',
+        'current_stock': float(rng.integers(0, 500)),
+        'days_ahead': 30,
+        'trend_model': 'closed_form',
+        'lead_time_days': int(rng.integers(1, 15)),
+        'safety_stock': float(rng.integers(0, 40)),
+        'sales_history': {'dates': dates, 'sold': rng.poisson(rng.uniform(1, 10), history_days).astype(float).tolist()}
+    } for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch restock planning')
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--history-days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    for n in opts.items:
+        items = make_items(n, opts.history_days, opts.seed)
+        start = time.perf_counter()
+        plans = plan_restock(items)
+        batch = time.perf_counter() - start
+        start = time.perf_counter()
+        singles = [_predict_stock(item) for item in items]
+        single = time.perf_counter() - start
+        agree = sum(p['stockout_date'] == s['stockout_date'] for p, s in zip(plans, singles))
+        print(json.dumps({
+            'items': n,
+            'plan_restock_ms': round(batch * 1000, 3),
+            'per_item_predict_ms': round(single * 1000, 3),
+            'speedup': round(single / batch, 1),
+            'stockout_dates_agree': f'{agree}/{n}'
+        }), flush=True)
+
+
+if __name__ == '__main__':
+    main()
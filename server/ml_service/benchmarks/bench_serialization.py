@@ -0,0 +1,76 @@
+"""
+Benchmark vectorized date formatting and check row output stays byte-compatible.
+
+Times format_dates against per-row strftime (the previous row format) for
+naive and timezone-aware date ranges of each --days length, at times just
+after and just before local midnight, and exits non-zero if any rendered date
+differs. Also checks that a stock forecast for a sales history with a non-UTC
+offset starts on the day after the last local sales date. Prints one JSON line
+per range.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --days 30 365 3650 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import format_dates  # noqa: E402
+from stock_prediction import _predict_stock  # noqa: E402
+
+TIMEZONES = [None, 'UTC', 'Asia/Kolkata', 'America/New_York', 'Pacific/Kiritimati']
+# Just after and just before local midnight, so offsets on either side of UTC change the UTC day
+TIMES_OF_DAY = ['00:30', '23:30']
+
+
+def best_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 3)
+
+
+def check_offset_history() -> bool:
+    """Records at 01:00 +05:30 fall on the previous day in UTC; the forecast must follow the local day."""
+    history = [{'date': f'2025-01-0{day}T01:00:00+05:30', 'sold': 2} for day in range(1, 4)]
+    result = _predict_stock({'current_stock': 10, 'sales_history': history, 'days_ahead': 3})
+    return result['projected'][0]['date'] == '2025-01-04'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized date formatting')
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 365, 3650])
+    parser.add_argument('--repeat', type=int, default=10)
+    opts = parser.parse_args()
+
+    ok = check_offset_history()
+    print(json.dumps({'offset_history_dates_match': ok}), flush=True)
+    for n_days in opts.days:
+        for tz in TIMEZONES:
+            ranges = [pd.date_range(f'2025-01-01 {t}', periods=n_days, freq='D', tz=tz) for t in TIMES_OF_DAY]
+            dates = ranges[0]
+            match = all(format_dates(r) == [d.strftime('%Y-%m-%d') for d in r]
+                        and format_dates(pd.Series(r)) == [d.strftime('%Y-%m-%d') for d in r] for r in ranges)
+            ok = ok and match
+            print(json.dumps({
+                'days': n_days,
+                'tz': tz,
+                'strftime_ms': best_ms(lambda: [d.strftime('%Y-%m-%d') for d in dates], opts.repeat),
+                'format_dates_ms': best_ms(lambda: format_dates(dates), opts.repeat),
+                'dates_match': match
+            }), flush=True)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
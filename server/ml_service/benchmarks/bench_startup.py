@@ -0,0 +1,95 @@
+"""
+Start-up benchmark and regression guard for the lightweight CLI commands.
+
+Runs each fast-path command (health, factors, calendar, list-crops) in a fresh
+interpreter, reports wall-clock latency next to a bare `python -c pass`
+baseline, and records whether numpy/pandas/sklearn/joblib were imported.
+
+With --check the script exits non-zero if any fast command imports a heavy
+library or its median overhead above the bare interpreter exceeds --budget-ms,
+so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --check --budget-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'joblib')
+
+FAST_COMMANDS = [
+    ('price_prediction.py', ['health']),
+    ('price_prediction.py', ['factors', 'rice']),
+    ('crop_recommendation.py', ['health']),
+    ('crop_recommendation.py', ['calendar', 'rice', '{"lat": 12.9, "lng": 77.6}']),
+    ('crop_recommendation.py', ['list-crops']),
+    ('stock_prediction.py', ['health']),
+]
+
+# Runs the script as __main__ and reports which heavy modules ended up loaded
+PROBE = (
+    'import json, runpy, sys\n'
+    'script = sys.argv[1]\n'
+    'sys.argv = sys.argv[1:]\n'
+    'runpy.run_path(script, run_name="__main__")\n'
+    'sys.stderr.write(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))\n'
+).format(heavy=HEAVY_MODULES)
+
+
+def run_once(argv):
+    start = time.perf_counter()
+    proc = subprocess.run(argv, cwd=ML_DIR, capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI start-up for fast-path commands')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--check', action='store_true', help='Exit 1 on heavy imports or budget overrun')
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='Allowed median overhead above a bare interpreter start')
+    opts = parser.parse_args()
+
+    baseline = statistics.median(run_once([sys.executable, '-c', 'pass'])[0] for _ in range(opts.repeat))
+    print(json.dumps({'command': 'python -c pass', 'median_ms': round(baseline * 1000, 1)}))
+
+    failures = []
+    for script, args in FAST_COMMANDS:
+        timings = []
+        heavy = []
+        for _ in range(opts.repeat):
+            elapsed, proc = run_once([sys.executable, '-c', PROBE, script, *args])
+            timings.append(elapsed)
+            try:
+                heavy = json.loads(proc.stderr.strip().splitlines()[-1])
+            except (ValueError, IndexError):
+                heavy = ['<probe failed>']
+        median_ms = statistics.median(timings) * 1000
+        overhead_ms = median_ms - baseline * 1000
+        label = ' '.join([script] + args[:2])
+        print(json.dumps({
+            'command': label,
+            'median_ms': round(median_ms, 1),
+            'overhead_ms': round(overhead_ms, 1),
+            'heavy_imports': heavy
+        }))
+        if heavy:
+            failures.append(f'{label}: imported {", ".join(heavy)}')
+        if overhead_ms > opts.budget_ms:
+            failures.append(f'{label}: {overhead_ms:.1f} ms over bare interpreter (budget {opts.budget_ms} ms)')
+
+    if opts.check and failures:
+        for failure in failures:
+            print(f'FAIL {failure}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
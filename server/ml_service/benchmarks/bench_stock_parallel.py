@@ -0,0 +1,85 @@
+"""
+Benchmark for stock_prediction.predict_stock_many.
+
+Generates a seeded catalogue of products and times the multi-product engine
+with 1, 4 and N (CPU count) workers, plus the vectorized closed-form path
+used for short trend_model='closed_form' histories against the per-product
+sklearn fit. Prints one JSON line per configuration.
+
+Usage:
+    python benchmarks/bench_stock_parallel.py
+    python benchmarks/bench_stock_parallel.py --products 2000 --history 365 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_prediction import predict_stock_many  # noqa: E402
+
+
+def make_catalogue(n_products: int, history_days: int, seed: int, trend_model: str = 'sklearn'):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=history_days, freq='D').strftime('%Y-%m-%d').tolist()
+    return [
+        {
+            'product_name': f'product_{i}',
+            'current_stock': float(rng.integers(10, 500)),
+            'days_ahead': 30,
+            'trend_model': trend_model,
+            'sales_history': {'dates': dates, 'sold': rng.poisson(5, history_days).astype(float).tolist()}
+        }
+        for i in range(n_products)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multi-product stock forecasting')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--history', type=int, default=180)
+    parser.add_argument('--small-history', type=int, default=14)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, os.cpu_count() or 1])
+    parser.add_argument('--seed', type=int, default=42)
+    opts = parser.parse_args()
+
+    catalogue = make_catalogue(opts.products, opts.history, opts.seed)
+    for workers in dict.fromkeys(opts.workers):
+        # small_series_max=0 forces every product through the per-product sklearn path
+        elapsed = timed(lambda: predict_stock_many(catalogue, workers=workers, small_series_max=0))
+        print(json.dumps({
+            'mode': 'process_pool',
+            'workers': workers,
+            'products': opts.products,
+            'history_days': opts.history,
+            'seconds': round(elapsed, 4),
+            'products_per_second': round(opts.products / elapsed, 1)
+        }))
+
+    # Short histories: the per-product sklearn fit against the batched closed form
+    for mode, trend_model in (('per_product', 'sklearn'), ('closed_form_batch', 'closed_form')):
+        small_catalogue = make_catalogue(opts.products, opts.small_history, opts.seed, trend_model)
+        elapsed = timed(lambda: predict_stock_many(small_catalogue, workers=1, small_series_max=opts.small_history))
+        print(json.dumps({
+            'mode': mode,
+            'workers': 1,
+            'products': opts.products,
+            'history_days': opts.small_history,
+            'seconds': round(elapsed, 4),
+            'products_per_second': round(opts.products / elapsed, 1)
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+Reproducible benchmark harness for the ML service entry points.
+
+Covers, with fixed seeds and no network access:
+    cold_start   each script in a fresh interpreter: a model-free command, a model
+                 command with an empty model store (trains) and with a warm store
+    training     CropRecommendationSystem and PricePredictionSystem(preload=True)
+                 trained from scratch in-process
+    crop         CropRecommendationSystem.predict (single) and predict_batch
+    price        PricePredictionSystem.predict_price across horizons
+    stock        stock_prediction.predict_stock across history lengths and trend models
+
+Every case reports p50/p95/mean latency, throughput (items per second) and the
+peak RSS seen so far (children report their own peak). Forecast caches are
+disabled (ML_CACHE_SIZE=0) and models live in a throwaway directory unless
+--models-dir is given, so runs do not depend on earlier state.
+
+Results are written as one JSON document; pass --baseline with an earlier file
+to print p50 ratios per case.
+
+Usage:
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --only crop price --repeat 200 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+SECTIONS = ('cold_start', 'training', 'crop', 'price', 'stock')
+
+COLD_START_COMMANDS = [
+    ('price_prediction.py', ['health'], ['predict', 'rice', '30']),
+    ('crop_recommendation.py', ['health'],
+     ['predict', '{"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82, "ph": 6.5, "rainfall": 203}']),
+    ('stock_prediction.py', ['health'], None),
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(timings, items_per_call: int = 1) -> dict:
+    """Latency percentiles (ms) and throughput for a list of per-call durations in seconds."""
+    ordered = sorted(timings)
+    n = len(ordered)
+
+    def pct(q):
+        return ordered[min(n - 1, int(round(q * (n - 1))))] * 1000
+
+    total = sum(ordered)
+    return {
+        'calls': n,
+        'items_per_call': items_per_call,
+        'p50_ms': round(pct(0.50), 3),
+        'p95_ms': round(pct(0.95), 3),
+        'mean_ms': round(total / n * 1000, 3),
+        'throughput_per_s': round(n * items_per_call / total, 1) if total else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def time_calls(fn, repeat: int, warmup: int = 3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_child(argv, env):
+    """Run a command to completion; return (seconds, child peak RSS in MB, exit code)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(argv, cwd=ML_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return elapsed, usage.ru_maxrss / scale, proc.returncode
+
+
+def bench_cold_start(opts, report):
+    for script, fast_args, model_args in COLD_START_COMMANDS:
+        cases = [('no_model', fast_args, False)]
+        if model_args:
+            cases += [('train', model_args, True), ('warm_store', model_args, False)]
+        for label, args, fresh_store in cases:
+            timings, peaks, failures = [], [], 0
+            with tempfile.TemporaryDirectory(prefix='bench-models-') as store:
+                env = dict(os.environ, ML_MODELS_DIR=store, ML_HISTORY_DIR=os.path.join(store, 'history'))
+                if label == 'warm_store':
+                    run_child([sys.executable, script, *args], env)
+                for _ in range(opts.cold_repeat):
+                    if fresh_store:
+                        for entry in os.listdir(store):
+                            shutil.rmtree(os.path.join(store, entry), ignore_errors=True)
+                    elapsed, peak, code = run_child([sys.executable, script, *args], env)
+                    timings.append(elapsed)
+                    peaks.append(peak)
+                    failures += code != 0
+            result = summarize(timings)
+            result['peak_rss_mb'] = round(max(peaks), 1)
+            result['failures'] = failures
+            report(f'cold_start/{script}/{args[0]}/{label}', result)
+
+
+def bench_training(opts, report):
+    from crop_recommendation import CropRecommendationSystem
+    from model_registry import ModelRegistry
+    from price_prediction import PricePredictionSystem
+
+    def train_crop():
+        with tempfile.TemporaryDirectory() as store:
+            CropRecommendationSystem(registry=ModelRegistry(store), seed=opts.seed)
+
+    def train_price():
+        with tempfile.TemporaryDirectory() as store:
+            PricePredictionSystem(registry=ModelRegistry(store), seed=opts.seed, preload=True)
+
+    report('training/crop_recommendation', summarize(time_calls(train_crop, opts.train_repeat, warmup=0)))
+    report('training/price_prediction', summarize(time_calls(train_price, opts.train_repeat, warmup=0)))
+
+
+def bench_crop(opts, report, rng):
+    import numpy as np
+    from crop_recommendation import SOIL_FEATURES, CropRecommendationSystem
+
+    recommender = CropRecommendationSystem(seed=opts.seed)
+    low = np.array([0, 5, 5, 10, 20, 4.5, 30], dtype=float)
+    high = np.array([140, 145, 205, 40, 95, 8.5, 280], dtype=float)
+
+    def samples(n):
+        values = rng.uniform(low, high, size=(n, len(SOIL_FEATURES)))
+        return [dict(zip(SOIL_FEATURES, row.tolist())) for row in values]
+
+    pool = samples(opts.repeat)
+    it = iter(pool * 2)
+    report('crop/predict/single', summarize(time_calls(lambda: recommender.predict(next(it)), opts.repeat)))
+
+    for size in opts.crop_batches:
+        batch = samples(size)
+        repeat = max(5, opts.repeat // max(1, size // 8))
+        report(f'crop/predict_batch/{size}',
+               summarize(time_calls(lambda: recommender.predict_batch(batch), repeat), items_per_call=size))
+
+
+def bench_price(opts, report):
+    from price_prediction import PricePredictionSystem
+
+    predictor = PricePredictionSystem(seed=opts.seed, preload=True)
+    for days in opts.horizons:
+        report(f'price/predict_price/{days}d',
+               summarize(time_calls(lambda: predictor.predict_price('rice', days), opts.repeat)))
+
+
+def bench_stock(opts, report, rng):
+    import pandas as pd
+    from stock_prediction import predict_stock
+
+    for length in opts.history_lengths:
+        dates = pd.date_range('2024-01-01', periods=length, freq='D').strftime('%Y-%m-%d').tolist()
+        sold = rng.poisson(5, length).astype(float).tolist()
+        for trend_model in ('sklearn', 'closed_form'):
+            payload = {
+                'product_name': 'bench',
+                'current_stock': 200.0,
+                'days_ahead': 30,
+                'sales_history': [{'date': d, 'sold': s} for d, s in zip(dates, sold)],
+                'trend_model': trend_model
+            }
+            report(f'stock/predict_stock/{length}d/{trend_model}',
+                   summarize(time_calls(lambda: predict_stock(payload), opts.repeat)))
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or not before.get('p50_ms'):
+            continue
+        print(json.dumps({
+            'case': name,
+            'baseline_p50_ms': before['p50_ms'],
+            'p50_ms': current['p50_ms'],
+            'ratio': round(current['p50_ms'] / before['p50_ms'], 3)
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ML service entry points')
+    parser.add_argument('--only', nargs='+', choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument('--repeat', type=int, default=50, help='Timed calls per in-process case')
+    parser.add_argument('--cold-repeat', type=int, default=3, help='Fresh interpreters per cold-start case')
+    parser.add_argument('--train-repeat', type=int, default=2)
+    parser.add_argument('--crop-batches', type=int, nargs='+', default=[8, 64, 512])
+    parser.add_argument('--horizons', type=int, nargs='+', default=[7, 30, 90, 365])
+    parser.add_argument('--history-lengths', type=int, nargs='+', default=[7, 30, 180, 730])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--models-dir', default=None, help='Reuse this model store instead of a temporary one')
+    parser.add_argument('--output', default=None, help='Write the JSON report here')
+    parser.add_argument('--baseline', default=None, help='Earlier --output file to compare p50 against')
+    opts = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix='bench-suite-')
+    models_dir = opts.models_dir or scratch.name
+    # Must be set before the service modules are imported: the cache reads its size at import
+    os.environ['ML_MODELS_DIR'] = models_dir
+    os.environ['ML_HISTORY_DIR'] = os.path.join(scratch.name, 'history')
+    os.environ['ML_CACHE_SIZE'] = '0'
+
+    import numpy as np
+    rng = np.random.default_rng(opts.seed)
+    results = {}
+
+    def report(name, result):
+        results[name] = result
+        print(json.dumps({'case': name, **result}), flush=True)
+
+    try:
+        for section in SECTIONS:
+            if section not in opts.only:
+                continue
+            if section == 'cold_start':
+                bench_cold_start(opts, report)
+            elif section == 'training':
+                bench_training(opts, report)
+            elif section == 'crop':
+                bench_crop(opts, report, rng)
+            elif section == 'price':
+                bench_price(opts, report)
+            elif section == 'stock':
+                bench_stock(opts, report, rng)
+    finally:
+        scratch.cleanup()
+
+    document = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': opts.seed,
+        'settings': {k: v for k, v in vars(opts).items() if k not in ('output', 'baseline')},
+        'results': results
+    }
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if opts.baseline:
+        compare(results, opts.baseline)
+
+
+if __name__ == '__main__':
+    main()
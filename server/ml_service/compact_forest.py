@@ -0,0 +1,155 @@
+"""
+Compact inference engine for a trained RandomForestClassifier.
+
+The forest is flattened into a handful of NumPy arrays shared by all trees:
+split feature, threshold, left/right child (global node ids) and a per-node
+class-probability table. Samples are pushed through every tree at once with
+vectorized gathers, one step per tree level, so a single prediction costs a
+few dozen array operations instead of sklearn's per-tree dispatch.
+
+Leaves point back to themselves, which lets traversal run a fixed number of
+steps (the forest's maximum depth) without per-node leaf checks.
+
+Arrays can be exported to a directory of .npy files and loaded with
+np.load(mmap_mode='r'), so many processes share one copy through the page cache.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes')
+
+
+class CompactForest:
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, classes: np.ndarray, max_depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, forest: Any) -> 'CompactForest':
+        """Flatten a fitted RandomForestClassifier (single output) into global node arrays."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(n, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop to themselves so extra traversal steps are no-ops
+            left = np.where(is_leaf, ids, tree.children_left) + offset
+            right = np.where(is_leaf, ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            counts = tree.value[:, 0, :].astype(np.float64)
+            totals = counts.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+
+            features.append(feature.astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left.astype(np.int32))
+            rights.append(right.astype(np.int32))
+            values.append(counts / totals)
+            roots.append(offset)
+            max_depth = max(max_depth, int(tree.max_depth))
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(forest.classes_).astype(str),
+            max_depth=max_depth
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Average leaf class probabilities over all trees for an (n, n_features) matrix."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[None, :]
+        node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=0)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path: str):
+        """Write the arrays as .npy files into a new directory at `path` (atomic rename)."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.compact-', dir=parent)
+        try:
+            for name in ARRAY_NAMES:
+                array = self.classes_ if name == 'classes' else getattr(self, name)
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({'max_depth': self.max_depth, 'n_trees': self.n_trees}, f)
+            os.chmod(tmp_dir, 0o755)
+            os.rename(tmp_dir, path)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Another process finished the same export first; keep theirs
+            if not os.path.isdir(path):
+                raise
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> 'CompactForest':
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ARRAY_NAMES
+        }
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(max_depth=meta['max_depth'], **arrays)
+
+    @classmethod
+    def load_or_export(cls, root: str, name: str, key: str, forest: Any,
+                       mmap_mode: Optional[str] = 'r') -> 'CompactForest':
+        """Load the export for `key` from `root`, creating it from `forest` if missing or unreadable."""
+        path = os.path.join(root, f'{name}-{key[:16]}')
+        if os.path.isdir(path):
+            try:
+                return cls.load(path, mmap_mode=mmap_mode)
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(path, ignore_errors=True)
+        compact = cls.from_sklearn(forest)
+        try:
+            compact.save(path)
+            # Drop exports left behind by older model versions
+            for entry in os.listdir(root):
+                if entry.startswith(f'{name}-') and entry != os.path.basename(path):
+                    shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+            return cls.load(path, mmap_mode=mmap_mode)
+        except OSError:
+            return compact
+
+
+def max_parity_error(compact: CompactForest, forest: Any, X: np.ndarray) -> float:
+    """Largest absolute difference between compact and sklearn probabilities on X."""
+    return float(np.max(np.abs(compact.predict_proba(X) - forest.predict_proba(X))))
@@ -1,90 +1,226 @@
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-import joblib
+from __future__ import annotations
+
 import os
 import sys
 import json
-from typing import Dict, List, Union, Optional
+from typing import Dict, List, Tuple, Union, Optional
 
-def validate_soil_data(data: Dict) -> bool:
-    """Validate soil data input"""
-    required_fields = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    ranges = {
-        'N': (0, 200),
-        'P': (0, 200),
-        'K': (0, 200),
-        'temperature': (0, 50),
-        'humidity': (0, 100),
-        'ph': (0, 14),
-        'rainfall': (0, 300)
+from forecast_cache import ForecastCache
+from lazy_imports import LazyModule, missing_modules
+from model_registry import ModelRegistry, fingerprint
+from telemetry import cli_response, metrics_response, span, timed
+
+# Heavy libraries load on first use so health/calendar/list-crops answer without importing them
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+
+REQUIRED_MODULES = ('numpy', 'pandas', 'sklearn', 'joblib')
+# Commands that need a trained model (everything else is answered statically)
+MODEL_COMMANDS = ('health', 'predict', 'cache-stats', 'predict-batch', 'predict-batch-file', 'sweep')
+
+# Crop labels (you can expand this list)
+CROP_LABELS = ['rice', 'wheat', 'mung bean', 'Tea', 'millet', 'maize', 'lentil', 'jute', 'coffee', 'cotton', 'ground nut', 'peas', 'rubber', 'sugarcane', 'tobacco', 'kidney beans', 'moth beans', 'coconut', 'black gram', 'adzuki beans', 'pigeon peas', 'chick peas', 'banana', 'grapes', 'apple', 'mango', 'muskmelon', 'orange', 'papaya', 'pomegranate', 'watermelon']
+
+# This is a simplified version. You can expand with real data
+CROP_CALENDARS = {
+    'rice': {
+        'planting_season': ['June', 'July'],
+        'harvesting_season': ['November', 'December'],
+        'duration_months': 5
+    },
+    'wheat': {
+        'planting_season': ['October', 'November'],
+        'harvesting_season': ['March', 'April'],
+        'duration_months': 6
     }
-    
-    try:
-        # Check all required fields exist and are within range
-        for field in required_fields:
-            value = float(data.get(field, None))
-            if value is None:
-                return False
-            min_val, max_val = ranges[field]
-            if value < min_val or value > max_val:
-                return False
-        return True
-    except (TypeError, ValueError):
-        return False
+    # Add more crops
+}
 
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-import joblib
-import os
-import sys
-import json
+CROP_MODEL_FILE = 'crop_recommendation_model.joblib'
+
+# Single source of truth for soil input fields and their accepted (inclusive) ranges
+SOIL_SCHEMA = {
+    'N': (0, 200),
+    'P': (0, 200),
+    'K': (0, 200),
+    'temperature': (0, 50),
+    'humidity': (0, 100),
+    'ph': (0, 14),
+    'rainfall': (0, 300)
+}
+SOIL_FEATURES = list(SOIL_SCHEMA)
+
+# Above this many rows sklearn's compiled tree traversal beats the compact engine
+COMPACT_MAX_BATCH = 64
+
+# What-if sweeps: largest grid accepted and rows scored per predict_proba call
+SWEEP_MAX_POINTS = 250_000
+SWEEP_CHUNK_ROWS = 8192
 
-def validate_soil_data(data):
+def validate_soil_batch(samples) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert and validate soil samples in one vectorized pass.
+    samples: list of soil dicts, list of 7-value rows, or a DataFrame with the soil columns.
+    Returns (X, field_errors): X is an (n, 7) float matrix in SOIL_FEATURES order and
+    field_errors an (n, 7) bool mask that is True where a field is missing, non-numeric
+    or outside its SOIL_SCHEMA range.
+    """
+    if isinstance(samples, pd.DataFrame):
+        frame = samples.reindex(columns=SOIL_FEATURES)
+    else:
+        samples = list(samples)
+        if samples and not isinstance(samples[0], dict):
+            frame = pd.DataFrame(samples, columns=SOIL_FEATURES)
+        else:
+            frame = pd.DataFrame.from_records(
+                [rec if isinstance(rec, dict) else {} for rec in samples],
+                columns=SOIL_FEATURES
+            )
+    X = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float).reshape(-1, len(SOIL_FEATURES))
+    bounds = np.array(list(SOIL_SCHEMA.values()), dtype=float)
+    with np.errstate(invalid='ignore'):
+        in_range = (X >= bounds[:, 0]) & (X <= bounds[:, 1])
+    # NaN (missing or unparseable) compares False, so it is flagged as well
+    return X, ~in_range
+
+def soil_samples_to_array(samples) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert soil samples into an (n, 7) float matrix in SOIL_FEATURES order.
+    Returns (X, valid) where valid flags rows that pass every SOIL_SCHEMA check.
+    """
+    X, field_errors = validate_soil_batch(samples)
+    return X, ~field_errors.any(axis=1)
+
+def validate_soil_data(data: Dict) -> bool:
     """Validate soil data input"""
-    required_fields = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
     if not isinstance(data, dict):
         return False
-    
-    for field in required_fields:
-        if field not in data:
-            return False
-        try:
-            float(data[field])
-        except (ValueError, TypeError):
-            return False
-    
-    return True
+    _, field_errors = validate_soil_batch([data])
+    return not field_errors.any()
+
+def soil_error_message(field_errors_row: np.ndarray) -> str:
+    fields = [field for field, bad in zip(SOIL_FEATURES, field_errors_row) if bad]
+    return f'Invalid or missing soil data fields: {", ".join(fields)}'
+
+def sweep_axis_size(field: str, spec) -> int:
+    """Number of values a sweep axis spec asks for, without building the axis."""
+    if isinstance(spec, dict):
+        num = int(spec.get('num', 0))
+        if num < 1:
+            raise ValueError(f'{field}: num must be at least 1')
+        return num
+    if isinstance(spec, list) and spec:
+        return len(spec)
+    raise ValueError(f'{field}: expected a list of values or {{start, stop, num}}')
+
+def sweep_axis(field: str, spec) -> np.ndarray:
+    """
+    Values for one varied field: an explicit list, or {start, stop, num} spaced like np.linspace.
+    Every value must lie inside the field's SOIL_SCHEMA range.
+    """
+    if field not in SOIL_SCHEMA:
+        raise ValueError(f'Unknown soil field: {field}')
+    num = sweep_axis_size(field, spec)
+    if isinstance(spec, dict):
+        values = np.linspace(float(spec['start']), float(spec['stop']), num)
+    else:
+        values = np.asarray(spec, dtype=float)
+    low, high = SOIL_SCHEMA[field]
+    if not np.all((values >= low) & (values <= high)):
+        raise ValueError(f'{field}: values must be between {low} and {high}')
+    return values
+
+def sweep_grid(base: Dict, axes: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    The full Cartesian grid of a what-if sweep as one (n, 7) matrix in SOIL_FEATURES order.
+    Unvaried fields keep their base value; rows run over the axes in C order (last axis fastest).
+    """
+    X, field_errors = validate_soil_batch([base])
+    bad = [field for field, err in zip(SOIL_FEATURES, field_errors[0]) if err and field not in axes]
+    if bad:
+        raise ValueError(f'Invalid or missing base soil fields: {", ".join(bad)}')
+    shape = tuple(len(values) for values in axes.values())
+    grid = np.repeat(X, int(np.prod(shape)), axis=0)
+    for field, column in zip(axes, np.meshgrid(*axes.values(), indexing='ij')):
+        grid[:, SOIL_FEATURES.index(field)] = column.ravel()
+    return grid
+
+def load_soil_samples(path: str):
+    """Read soil samples from a CSV or JSON file ('-' reads JSON from stdin)."""
+    if path == '-':
+        return json.load(sys.stdin)
+    if path.lower().endswith('.csv'):
+        return pd.read_csv(path)
+    with open(path) as f:
+        return json.load(f)
+
 
 class CropRecommendationSystem:
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None, seed: int = 42,
+                 cache: Optional[ForecastCache] = None, inference: Optional[str] = None):
+        from sklearn.preprocessing import StandardScaler
+
         self.model = None
+        # 'compact' scores with flattened NumPy tree arrays (compact_forest) instead of sklearn
+        self.inference = inference or os.environ.get('ML_CROP_INFERENCE', 'sklearn')
+        self.compact = None
         self.scaler = StandardScaler()
+        self.registry = registry or ModelRegistry()
+        self.cache = cache or ForecastCache()
+        self.seed = seed
+        self.loaded_from_cache = False
         self.initialize_model()
 
-    def initialize_model(self):
+    def generate_training_data(self) -> pd.DataFrame:
+        rng = np.random.default_rng(self.seed)
         # Sample data structure (you can expand this with real data)
         data = {
-            'N': np.random.randint(0, 140, 1000),
-            'P': np.random.randint(5, 145, 1000),
-            'K': np.random.randint(5, 205, 1000),
-            'temperature': np.random.uniform(8.83, 43.68, 1000),
-            'humidity': np.random.uniform(14.26, 99.98, 1000),
-            'ph': np.random.uniform(3.5, 9.94, 1000),
-            'rainfall': np.random.uniform(20.21, 298.56, 1000),
+            'N': rng.integers(0, 140, 1000),
+            'P': rng.integers(5, 145, 1000),
+            'K': rng.integers(5, 205, 1000),
+            'temperature': rng.uniform(8.83, 43.68, 1000),
+            'humidity': rng.uniform(14.26, 99.98, 1000),
+            'ph': rng.uniform(3.5, 9.94, 1000),
+            'rainfall': rng.uniform(20.21, 298.56, 1000),
         }
 
-        # Crop labels (you can expand this list)
-        crops = ['rice', 'wheat', 'mung bean', 'Tea', 'millet', 'maize', 'lentil', 'jute', 'coffee', 'cotton', 'ground nut', 'peas', 'rubber', 'sugarcane', 'tobacco', 'kidney beans', 'moth beans', 'coconut', 'black gram', 'adzuki beans', 'pigeon peas', 'chick peas', 'banana', 'grapes', 'apple', 'mango', 'muskmelon', 'orange', 'papaya', 'pomegranate', 'watermelon']
-        
         # Create DataFrame
         df = pd.DataFrame(data)
-        df['label'] = np.random.choice(crops, size=1000)
+        df['label'] = rng.choice(CROP_LABELS, size=1000)
+        return df
+
+    def initialize_model(self):
+        with span('crop.initialize.generate_data'):
+            df = self.generate_training_data()
+
+        # Reuse the persisted model unless the training config or data changed
+        config = {
+            'model': 'RandomForestClassifier',
+            'n_estimators': 100,
+            'random_state': 42,
+            'test_size': 0.2
+        }
+        with span('crop.initialize.fingerprint'):
+            key = fingerprint(config, df.drop('label', axis=1).values, df['label'].values)
+        bundle, self.loaded_from_cache = self.registry.load_or_train(
+            CROP_MODEL_FILE, key, lambda: self.train_model(df)
+        )
+        self.model = bundle['model']
+        self.scaler = bundle['scaler']
+        if self.inference == 'compact':
+            from compact_forest import CompactForest
+
+            with span('crop.initialize.compact_export'):
+                self.compact = CompactForest.load_or_export(
+                    self.registry.root, 'crop_recommendation_compact', key, self.model,
+                    mmap_mode=self.registry.mmap_mode or 'r'
+                )
+        self.cache.invalidate()
+
+    def train_model(self, df: pd.DataFrame) -> Dict:
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
 
         # Split features and target
         X = df.drop('label', axis=1)
@@ -94,47 +230,158 @@ class CropRecommendationSystem:
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
 
         # Train model
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.model.fit(X_train_scaled, y_train)
+        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        with span('crop.train'):
+            model.fit(X_train_scaled, y_train)
 
-        # Save model
-        if not os.path.exists('models'):
-            os.makedirs('models')
-        joblib.dump(self.model, 'models/crop_recommendation_model.joblib')
+        return {
+            'model': model,
+            'scaler': scaler
+        }
 
+    @timed('crop.predict')
     def predict(self, soil_data):
         """
         Predict crop based on soil and weather data
         soil_data: dict with keys ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
         """
         try:
-            # Convert input to correct format
-            input_data = pd.DataFrame([soil_data])
-            input_scaled = self.scaler.transform(input_data)
-            
-            # Get prediction and probabilities
-            prediction = self.model.predict(input_scaled)[0]
-            probabilities = self.model.predict_proba(input_scaled)[0]
-            confidence = np.max(probabilities)
-            
-            # Get top 3 recommendations
-            top_3_idx = np.argsort(probabilities)[-3:][::-1]
-            recommendations = [
+            with span('crop.validate'):
+                X, valid = soil_samples_to_array([soil_data])
+
+            def compute():
+                probabilities = self.predict_proba_array(X)
+                with span('crop.format'):
+                    return self._format_result(probabilities, 0)
+            if not valid[0]:
+                return compute()
+            # Memoized on the numeric feature values, so key order and extra fields don't matter
+            return self.cache.get_or_compute(tuple(X[0].tolist()), compute)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def predict_proba_array(self, X: np.ndarray) -> np.ndarray:
+        """Scale an (n, 7) feature matrix and score it in a single forest pass."""
+        # Same arithmetic as StandardScaler.transform, minus the DataFrame/feature-name checks
+        with span('crop.scale'):
+            X_scaled = (X - self.scaler.mean_) / self.scaler.scale_
+        with span('crop.inference'):
+            if self.compact is not None and len(X_scaled) <= COMPACT_MAX_BATCH:
+                return self.compact.predict_proba(X_scaled)
+            return self.model.predict_proba(X_scaled)
+
+    def _format_result(self, probabilities: np.ndarray, row: int, top_idx: Optional[np.ndarray] = None) -> Dict:
+        row_proba = probabilities[row]
+        if top_idx is None:
+            top_idx = np.argsort(row_proba)[-3:][::-1]
+        classes = self.model.classes_
+        # Top-1 is the argmax of the same probabilities, matching RandomForestClassifier.predict
+        return {
+            'success': True,
+            'recommendations': [
                 {
-                    'crop': self.model.classes_[idx],
-                    'confidence': float(probabilities[idx])
+                    'crop': classes[idx],
+                    'confidence': float(row_proba[idx])
                 }
-                for idx in top_3_idx
-            ]
-            
+                for idx in top_idx
+            ],
+            'top_prediction': classes[int(np.argmax(row_proba))],
+            'confidence': float(np.max(row_proba))
+        }
+
+    @timed('crop.predict_batch')
+    def predict_batch(self, samples) -> Dict:
+        """
+        Predict crops for many soil samples at once.
+        samples: list of soil dicts, list of 7-value rows, or a DataFrame with the soil columns.
+        Invalid rows are reported individually; valid rows are scored in one predict_proba call.
+        """
+        try:
+            with span('crop.validate'):
+                X, field_errors = validate_soil_batch(samples)
+            valid = ~field_errors.any(axis=1)
+            results = [None] * len(X)
+            for idx in np.flatnonzero(~valid):
+                results[idx] = {
+                    'success': False,
+                    'error': soil_error_message(field_errors[idx])
+                }
+
+            valid_idx = np.flatnonzero(valid)
+            if len(valid_idx):
+                probabilities = self.predict_proba_array(X[valid_idx])
+                with span('crop.format'):
+                    top_3 = np.argsort(probabilities, axis=1)[:, -3:][:, ::-1]
+                    for row, idx in enumerate(valid_idx):
+                        results[idx] = self._format_result(probabilities, row, top_3[row])
+
+            return {
+                'success': True,
+                'count': int(len(X)),
+                'valid_count': int(len(valid_idx)),
+                'results': results
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @timed('crop.sweep')
+    def sweep(self, base: Dict, vary: Dict, top_k: int = 3, chunk_rows: int = SWEEP_CHUNK_ROWS) -> Dict:
+        """
+        What-if sweep: score every combination of the varied fields around a base soil profile.
+        vary maps field -> list of values or {start, stop, num}. The grid is built as one array
+        and scored in chunks of chunk_rows, so only one chunk's probabilities exist at a time.
+        Returns top_indices (into classes) and confidences as tensors of shape axes + [top_k].
+        """
+        try:
+            if not isinstance(base, dict) or not isinstance(vary, dict) or not vary:
+                raise ValueError('Sweep needs a base soil profile and at least one field to vary')
+            # Size the grid from the specs first, so an oversized request allocates nothing
+            shape = [sweep_axis_size(field, spec) for field, spec in vary.items()]
+            n_points = 1
+            for size in shape:
+                n_points *= size
+            if n_points > SWEEP_MAX_POINTS:
+                raise ValueError(f'Sweep grid has {n_points} points; the limit is {SWEEP_MAX_POINTS}')
+            axes = {field: sweep_axis(field, spec) for field, spec in vary.items()}
+            classes = self.model.classes_
+            top_k = max(1, min(int(top_k), len(classes)))
+
+            with span('crop.sweep_grid'):
+                X = sweep_grid(base, axes)
+            top_idx = np.empty((n_points, top_k), dtype=np.int16)
+            confidence = np.empty((n_points, top_k))
+            chunk_rows = max(1, int(chunk_rows))
+            for start in range(0, n_points, chunk_rows):
+                probabilities = self.predict_proba_array(X[start:start + chunk_rows])
+                with span('crop.format'):
+                    # Same ordering as predict_batch's top 3: ascending argsort, reversed
+                    top = np.argsort(probabilities, axis=1)[:, -top_k:][:, ::-1]
+                    top_idx[start:start + len(top)] = top
+                    confidence[start:start + len(top)] = np.take_along_axis(probabilities, top, axis=1)
+
             return {
                 'success': True,
-                'recommendations': recommendations,
-                'top_prediction': prediction,
-                'confidence': float(confidence)
+                'axes': [
+                    {
+                        'field': field,
+                        'values': values.tolist()
+                    }
+                    for field, values in axes.items()
+                ],
+                'classes': list(classes),
+                'shape': shape + [top_k],
+                'top_indices': top_idx.reshape(shape + [top_k]).tolist(),
+                'confidences': confidence.reshape(shape + [top_k]).tolist()
             }
         except Exception as e:
             return {
@@ -146,122 +393,204 @@ class CropRecommendationSystem:
         """
         Get planting and harvesting calendar for a crop
         """
-        # This is a simplified version. You can expand with real data
-        calendars = {
-            'rice': {
-                'planting_season': ['June', 'July'],
-                'harvesting_season': ['November', 'December'],
-                'duration_months': 5
-            },
-            'wheat': {
-                'planting_season': ['October', 'November'],
-                'harvesting_season': ['March', 'April'],
-                'duration_months': 6
-            }
-            # Add more crops
+        return get_crop_calendar(crop, location)
+
+def get_crop_calendar(crop, location):
+    """
+    Get planting and harvesting calendar for a crop (static lookup, no model needed)
+    """
+    return CROP_CALENDARS.get(crop.lower(), {
+        'planting_season': ['Unknown'],
+        'harvesting_season': ['Unknown'],
+        'duration_months': 0
+    })
+
+def quick_health(registry: Optional[ModelRegistry] = None) -> Dict:
+    """
+    Health check that avoids importing the ML stack or training:
+    verifies dependencies are installed and reports whether a trained artifact is on disk.
+    """
+    missing = missing_modules(REQUIRED_MODULES)
+    if missing:
+        return {
+            'success': False,
+            'status': 'unhealthy',
+            'error': f'Missing dependencies: {", ".join(missing)}'
         }
-        
-        return calendars.get(crop.lower(), {
-            'planting_season': ['Unknown'],
-            'harvesting_season': ['Unknown'],
-            'duration_months': 0
-        })
+    registry = registry or ModelRegistry()
+    return {
+        'success': True,
+        'status': 'healthy',
+        'message': 'Dependencies available; model loads on first prediction',
+        'model_cached': os.path.exists(registry.path(CROP_MODEL_FILE))
+    }
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({
+def run_command(args: List[str], recommender: Optional['CropRecommendationSystem'] = None) -> Dict:
+    """
+    Execute one CLI command and return its JSON-serializable response.
+    args mirrors sys.argv[1:]; JSON arguments may be passed as strings or already-decoded objects.
+    """
+    if len(args) < 1:
+        return {
             'success': False,
             'error': 'No command provided'
-        }))
-        return
+        }
+
+    command = args[0]
 
-    command = sys.argv[1]
-    
     try:
-        recommender = CropRecommendationSystem()
-        
+        # Static lookups and health never need a trained model
+        if command == 'calendar':
+            if len(args) < 3:
+                return {
+                    'success': False,
+                    'error': 'Missing crop name or location'
+                }
+
+            crop = args[1]
+            try:
+                location = json.loads(args[2]) if isinstance(args[2], str) else args[2]
+                result = get_crop_calendar(crop, location)
+                return {
+                    'success': True,
+                    'calendar': result
+                }
+            except (json.JSONDecodeError, KeyError):
+                return {
+                    'success': False,
+                    'error': 'Invalid location data'
+                }
+
+        if command == 'list-crops':
+            # Return list of available crops (the labels the model is trained on)
+            crops = sorted(recommender.model.classes_) if recommender is not None else sorted(CROP_LABELS)
+            return {
+                'success': True,
+                'crops': crops
+            }
+
+        if command == 'health' and recommender is None:
+            return quick_health()
+
+        if command == 'metrics':
+            return metrics_response()
+
+        if command not in MODEL_COMMANDS:
+            return {
+                'success': False,
+                'error': f'Unknown command: {command}'
+            }
+
+        if recommender is None:
+            recommender = CropRecommendationSystem()
+
         if command == 'health':
             # Health check - verify model is loaded
             if recommender.model is not None:
-                print(json.dumps({
+                return {
                     'success': True,
                     'status': 'healthy',
                     'message': 'Model is loaded and ready'
-                }))
-            else:
-                print(json.dumps({
-                    'success': False,
-                    'status': 'unhealthy',
-                    'error': 'Model failed to load'
-                }))
-                
-        elif command == 'list-crops':
-            # Return list of available crops
-            crops = sorted(recommender.model.classes_)
-            print(json.dumps({
-                'success': True,
-                'crops': crops
-            }))
-            
+                }
+            return {
+                'success': False,
+                'status': 'unhealthy',
+                'error': 'Model failed to load'
+            }
+
         elif command == 'predict':
-            if len(sys.argv) < 3:
-                print(json.dumps({
+            if len(args) < 2:
+                return {
                     'success': False,
                     'error': 'No soil data provided'
-                }))
-                return
-            
+                }
+
             try:
-                soil_data = json.loads(sys.argv[2])
+                soil_data = json.loads(args[1]) if isinstance(args[1], str) else args[1]
             except json.JSONDecodeError:
-                print(json.dumps({
+                return {
                     'success': False,
                     'error': 'Invalid JSON data'
-                }))
-                return
-                
+                }
+
             if not validate_soil_data(soil_data):
-                print(json.dumps({
+                return {
                     'success': False,
                     'error': 'Invalid or missing soil data fields'
-                }))
-                return
-            
-            result = recommender.predict(soil_data)
-            print(json.dumps(result))
-            
-        elif command == 'calendar':
-            if len(sys.argv) < 4:
-                print(json.dumps({
+                }
+
+            return recommender.predict(soil_data)
+
+        elif command == 'cache-stats':
+            return {
+                'success': True,
+                'cache': recommender.cache.stats()
+            }
+
+        elif command in ('predict-batch', 'predict-batch-file'):
+            if len(args) < 2:
+                return {
                     'success': False,
-                    'error': 'Missing crop name or location'
-                }))
-                return
-                
-            crop = sys.argv[2]
+                    'error': 'No soil samples provided'
+                }
+
             try:
-                location = json.loads(sys.argv[3])
-                result = recommender.get_crop_calendar(crop, location)
-                print(json.dumps({
-                    'success': True,
-                    'calendar': result
-                }))
-            except (json.JSONDecodeError, KeyError):
-                print(json.dumps({
+                if command == 'predict-batch-file':
+                    samples = load_soil_samples(args[1])
+                else:
+                    samples = json.loads(args[1]) if isinstance(args[1], str) else args[1]
+            except (json.JSONDecodeError, OSError, ValueError) as e:
+                return {
                     'success': False,
-                    'error': 'Invalid location data'
-                }))
-        else:
-            print(json.dumps({
-                'success': False,
-                'error': f'Unknown command: {command}'
-            }))
-            
+                    'error': f'Invalid soil samples: {e}'
+                }
+
+            if isinstance(samples, dict):
+                samples = samples.get('samples', [])
+            if not isinstance(samples, (list, pd.DataFrame)):
+                return {
+                    'success': False,
+                    'error': 'Soil samples must be a list'
+                }
+
+            return recommender.predict_batch(samples)
+
+        elif command == 'sweep':
+            if len(args) < 2:
+                return {
+                    'success': False,
+                    'error': 'No sweep specification provided'
+                }
+
+            try:
+                spec = json.loads(args[1]) if isinstance(args[1], str) else args[1]
+            except json.JSONDecodeError:
+                return {
+                    'success': False,
+                    'error': 'Invalid JSON data'
+                }
+            if not isinstance(spec, dict):
+                return {
+                    'success': False,
+                    'error': 'Sweep specification must be an object with base and vary'
+                }
+
+            return recommender.sweep(spec.get('base'), spec.get('vary'), spec.get('top_k', 3),
+                                     spec.get('chunk_rows', SWEEP_CHUNK_ROWS))
+
+        return {
+            'success': False,
+            'error': f'Unknown command: {command}'
+        }
+
     except Exception as e:
-        print(json.dumps({
+        return {
             'success': False,
             'error': str(e)
-        }))
+        }
+
+def main():
+    print(cli_response(run_command, sys.argv[1:]))
 
 if __name__ == '__main__':
     main()
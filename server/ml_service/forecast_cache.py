@@ -0,0 +1,125 @@
+"""
+In-process LRU cache with TTL for predictor results.
+
+Forecasts here depend only on their inputs, the trained model and the current
+calendar day, so results are memoized per key and the whole cache is dropped
+when the local date rolls over or when invalidate() is called after a model
+reload. Hit/miss/eviction counters are exposed through stats() for sizing.
+
+ML_CACHE_SIZE (entries, 0 disables) and ML_CACHE_TTL (seconds) set the defaults.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+DEFAULT_MAXSIZE = int(os.environ.get('ML_CACHE_SIZE', 1024))
+DEFAULT_TTL = float(os.environ.get('ML_CACHE_TTL', 3600))
+
+
+def payload_key(payload: Any) -> str:
+    """Stable digest for JSON-like request payloads (dicts, lists, scalars)."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class ForecastCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and calendar-day invalidation.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 today: Callable[[], date] = date.today):
+        self.maxsize = DEFAULT_MAXSIZE if maxsize is None else maxsize
+        self.ttl = DEFAULT_TTL if ttl is None else ttl
+        self._clock = clock
+        self._today = today
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._day = today()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _check_day(self):
+        today = self._today()
+        if today != self._day:
+            self._entries.clear()
+            self._day = today
+            self.invalidations += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self._check_day()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_day()
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Return the cached value for key, computing and storing it on a miss."""
+        if not self.enabled:
+            return compute()
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        value = compute()
+        if cacheable(value):
+            self.put(key, value)
+        return value
+
+    def invalidate(self):
+        """Drop every entry, e.g. after models are retrained or reloaded."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,214 @@
+"""
+Memory-mapped columnar store of daily series: observed prices per crop and
+sales per product.
+
+Each series is one binary file under the store root: a 16-byte header (magic,
+first day as days since 1970-01-01) followed by one little-endian float64 per
+day, so a date's value sits at a fixed offset and days without data are NaN.
+Reads memory-map the file and slice the requested date range, touching only
+those pages. Days after the last stored one are added with a single O_APPEND
+write (gaps padded with NaN); stored days are overwritten in place through a
+writable memmap, so the latest value wins; days before the first one rewrite
+the file into a temporary copy that atomically replaces it. Writers serialize
+on a lock file in the store root; readers never block.
+
+    PriceHistoryStore  per crop, ML_HISTORY_DIR (default models/price_history)
+    SalesHistoryStore  per product, ML_SALES_HISTORY_DIR (default models/sales_history)
+
+Both return DataFrame(date, <value column>) sorted by date.
+"""
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from lazy_imports import LazyModule
+from model_registry import DEFAULT_MODELS_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process still serialize on the thread lock
+    fcntl = None
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+SERIES_MAGIC = b'DAYSER01'
+HEADER_BYTES = 16
+SERIES_SUFFIX = '.f8'
+
+
+def to_days(dates) -> 'np.ndarray':
+    """Days since 1970-01-01 (int64) for dates given as strings, datetimes or datetime64 values."""
+    index = pd.DatetimeIndex(pd.to_datetime(dates))
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]').astype(np.int64)
+
+
+def to_day(value) -> int:
+    """Days since 1970-01-01 for one date; plain 'YYYY-MM-DD' strings skip the pandas parser."""
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            return int(np.datetime64(value, 'D').astype(np.int64))
+        except ValueError:
+            pass
+    return int(to_days([value])[0])
+
+
+class DailySeriesStore:
+    """One memory-mapped float64 column per series id, indexed by day offset from its first date."""
+
+    value_column = 'value'
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, series_id: str) -> str:
+        # ':' separates the owner from the id in route-scoped ids; not a valid file name character on Windows
+        safe = series_id.replace(os.sep, '_').replace('/', '_').replace(':', '_')
+        return os.path.join(self.root, safe + SERIES_SUFFIX)
+
+    def ids(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-len(SERIES_SUFFIX)] for name in os.listdir(self.root)
+                      if name.endswith(SERIES_SUFFIX) and not name.startswith('.'))
+
+    def extent(self, series_id: str) -> Optional[Tuple[int, int]]:
+        """(first day, number of days) covered by a series, or None if it is not stored."""
+        path = self.path(series_id)
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_BYTES)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return None
+        if len(header) != HEADER_BYTES or header[:8] != SERIES_MAGIC:
+            raise ValueError(f'Not a daily series file: {path}')
+        return int.from_bytes(header[8:], 'little', signed=True), (size - HEADER_BYTES) // 8
+
+    def version(self, series_id: str) -> Optional[Tuple[int, int]]:
+        """Changes whenever the series is written; None if it is not stored."""
+        try:
+            stat = os.stat(self.path(series_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def read_arrays(self, series_id: str, start=None, end=None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        (dates as datetime64[D], values) for the stored days in [start, end], both inclusive
+        and optional. Only the pages holding that range are read.
+        """
+        extent = self.extent(series_id)
+        if extent is None or extent[1] == 0:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+        first, n_days = extent
+        lo = 0 if start is None else int(np.clip(to_day(start) - first, 0, n_days))
+        hi = n_days if end is None else int(np.clip(to_day(end) - first + 1, lo, n_days))
+        if lo == hi:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+        column = np.memmap(self.path(series_id), dtype='<f8', mode='r', offset=HEADER_BYTES, shape=(n_days,))
+        window = np.array(column[lo:hi])
+        del column
+        present = np.flatnonzero(~np.isnan(window))
+        return (np.datetime64(first, 'D') + lo + present).astype('datetime64[D]'), window[present]
+
+    def read(self, series_id: str, start=None, end=None) -> 'pd.DataFrame':
+        """Stored days of a series in [start, end] as DataFrame(date, value_column) sorted by date."""
+        dates, values = self.read_arrays(series_id, start, end)
+        return pd.DataFrame({'date': dates.astype('datetime64[ns]'), self.value_column: values})
+
+    def append(self, series_id: str, observations: 'pd.DataFrame') -> int:
+        """
+        Store rows with 'date' and value_column columns; a date already stored is overwritten
+        (the last row wins within one call). Returns the number of days written.
+        """
+        if observations.empty:
+            return 0
+        days = to_days(observations['date'])
+        values = observations[self.value_column].to_numpy(dtype=float)
+        order = np.argsort(days, kind='stable')
+        days, values = days[order], values[order]
+        last = np.append(days[1:] != days[:-1], True)
+        days, values = days[last], values[last]
+
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, open(os.path.join(self.root, '.write.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            extent = self.extent(series_id)
+            if extent is None or days[0] < extent[0]:
+                self._rewrite(series_id, extent, days, values)
+            else:
+                self._update(series_id, extent, days, values)
+        return len(days)
+
+    def _update(self, series_id: str, extent: Tuple[int, int], days: 'np.ndarray', values: 'np.ndarray'):
+        first, n_days = extent
+        offsets = days - first
+        stored = offsets < n_days
+        if stored.any():
+            column = np.memmap(self.path(series_id), dtype='<f8', mode='r+', offset=HEADER_BYTES, shape=(n_days,))
+            column[offsets[stored]] = values[stored]
+            column.flush()
+            del column
+        if not stored.all():
+            tail = np.full(int(offsets[-1]) - n_days + 1, np.nan, dtype='<f8')
+            tail[offsets[~stored] - n_days] = values[~stored]
+            fd = os.open(self.path(series_id), os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, tail.tobytes())
+            finally:
+                os.close(fd)
+
+    def _rewrite(self, series_id: str, extent: Optional[Tuple[int, int]], days: 'np.ndarray', values: 'np.ndarray'):
+        first = int(days[0])
+        last = int(days[-1]) if extent is None else max(int(days[-1]), extent[0] + extent[1] - 1)
+        column = np.full(last - first + 1, np.nan, dtype='<f8')
+        if extent is not None and extent[1]:
+            old = np.memmap(self.path(series_id), dtype='<f8', mode='r', offset=HEADER_BYTES, shape=(extent[1],))
+            column[extent[0] - first:extent[0] - first + extent[1]] = old
+            del old
+        column[days - first] = values
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-', suffix=SERIES_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(SERIES_MAGIC + first.to_bytes(8, 'little', signed=True))
+                f.write(column.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path(series_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class PriceHistoryStore(DailySeriesStore):
+    """Observed daily market prices per crop."""
+
+    value_column = 'price'
+
+    def __init__(self, root: Optional[str] = None):
+        super().__init__(root or os.environ.get('ML_HISTORY_DIR') or os.path.join(DEFAULT_MODELS_DIR, 'price_history'))
+
+    def path(self, crop: str) -> str:
+        # Crop names are matched case-insensitively everywhere else in price prediction
+        return super().path(crop.lower())
+
+    def crops(self) -> List[str]:
+        return self.ids()
+
+
+class SalesHistoryStore(DailySeriesStore):
+    """Daily units sold per product; each stored value is that day's total."""
+
+    value_column = 'sold'
+
+    def __init__(self, root: Optional[str] = None):
+        super().__init__(root or os.environ.get('ML_SALES_HISTORY_DIR')
+                         or os.path.join(DEFAULT_MODELS_DIR, 'sales_history'))
@@ -0,0 +1,51 @@
+"""
+Deferred imports for the ML service scripts.
+
+pandas, NumPy and scikit-learn together take most of a second to import, which
+commands such as health, factors and calendar never need. LazyModule stands in
+for a module and imports it on first attribute access, so `np = LazyModule('numpy')`
+keeps call sites like `np.arange(...)` unchanged while cheap commands skip the
+import entirely.
+"""
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Iterable, List
+
+from telemetry import span
+
+
+class LazyModule:
+    """Proxy that imports the named module the first time an attribute is read."""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            with span(f"import.{self.__dict__['_name']}"):
+                module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<LazyModule '{self.__dict__['_name']}' ({state})>"
+
+
+def missing_modules(names: Iterable[str]) -> List[str]:
+    """Return the modules from `names` that are not installed, without importing any of them."""
+    missing = []
+    for name in names:
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            missing.append(name)
+    return missing
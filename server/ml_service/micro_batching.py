@@ -0,0 +1,309 @@
+"""
+Asyncio micro-batching front end for the model server.
+
+Concurrent `predict` requests are queued per service and coalesced into one
+batch once `max_batch_size` requests are waiting or the oldest has waited
+`max_wait_ms`. Each batch runs as a single vectorized call in a worker thread:
+
+    crop_recommendation  CropRecommendationSystem.predict_batch (one predict_proba)
+    price_prediction     PricePredictionSystem.predict_price_many (one model call per crop)
+    stock_prediction     closed_form payloads share one trend_forecast_batch solve;
+                         sklearn payloads run back to back in the same thread
+
+Results are fanned back to the waiting callers, so responses are identical to
+the unbatched server. Requests that fail validation and every other command go
+through ModelServer.dispatch unchanged.
+
+A larger batch size or wait raises throughput under load at the cost of tail
+latency; max_wait_ms=0 only batches requests that are already queued.
+ML_BATCH_SIZE and ML_BATCH_WAIT_MS set the defaults.
+
+Request lines may be up to ML_MAX_LINE_BYTES (default 64 MiB); a longer line
+is discarded and answered with an error, and the connection stays open.
+
+Usage:
+    python model_server.py --batch --port 8765 --batch-size 64 --max-wait-ms 2
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import crop_recommendation
+import price_prediction
+import stock_prediction
+import telemetry
+
+DEFAULT_BATCH_SIZE = int(os.environ.get('ML_BATCH_SIZE', 32))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('ML_BATCH_WAIT_MS', 5))
+# asyncio readers default to 64 KiB lines; inline sales histories easily exceed that
+MAX_LINE_BYTES = int(os.environ.get('ML_MAX_LINE_BYTES', 64 * 1024 * 1024))
+
+
+async def read_line(reader: asyncio.StreamReader) -> Tuple[bytes, bool]:
+    """
+    Next newline-terminated line (b'' at EOF) and whether it exceeded the reader's limit.
+    An oversized line is consumed and dropped, so the next read starts at the following line.
+    """
+    oversized = False
+    while True:
+        try:
+            line = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            oversized = True
+            await reader.readexactly(e.consumed)
+            continue
+        return (b'' if oversized else line), oversized
+
+
+class MicroBatcher:
+    """
+    Coalesce awaited submit() calls into lists for `batch_fn`, which must return one result per item.
+    Batches run one at a time on a dedicated worker thread; requests arriving meanwhile form the next batch.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, name: str = 'batch'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{name}-batch')
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item: Any) -> Any:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._call, items)
+            except Exception as e:
+                results = [e] * len(items)
+            self.batches += 1
+            self.items += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+            telemetry.count('batches_total', service=self.name)
+            telemetry.count('batched_requests_total', len(items), service=self.name)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _call(self, items: List[Any]) -> List[Any]:
+        with telemetry.span(f'batch.{self.name}'):
+            try:
+                return self.batch_fn(items)
+            except Exception:
+                if len(items) == 1:
+                    raise
+        # One bad item should not fail its neighbours: retry them one by one
+        results = []
+        for item in items:
+            try:
+                results.append(self.batch_fn([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': (self.items / self.batches) if self.batches else 0.0,
+            'largest_batch': self.largest_batch
+        }
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+
+def _stock_batch(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    closed_form = [i for i, p in enumerate(payloads) if p.get('trend_model') == 'closed_form']
+    for i, result in zip(closed_form, stock_prediction._predict_small_batch([payloads[i] for i in closed_form])):
+        results[i] = result
+    for i, payload in enumerate(payloads):
+        if results[i] is None:
+            results[i] = stock_prediction._safe_predict_stock(payload)
+    return results
+
+
+class BatchingFrontend:
+    """Route predict requests of a ModelServer through per-service MicroBatchers."""
+
+    def __init__(self, server, max_batch_size: int = DEFAULT_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.server = server
+        self.batchers = {
+            'crop_recommendation': MicroBatcher(
+                lambda samples: server.recommender.predict_batch(samples)['results'],
+                max_batch_size, max_wait_ms, name='crop_recommendation'),
+            'price_prediction': MicroBatcher(
+                server.price_predictor.predict_price_many, max_batch_size, max_wait_ms, name='price_prediction'),
+            'stock_prediction': MicroBatcher(
+                _stock_batch, max_batch_size, max_wait_ms, name='stock_prediction'),
+        }
+        # Non-batched commands (health, ingest, ...) run here so they never block the event loop
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ml-dispatch')
+
+    def batch_item(self, service: str, args: list) -> Optional[Any]:
+        """The batchable input for a valid predict request, or None to dispatch it unbatched."""
+        if len(args) < 2 or args[0] != 'predict':
+            return None
+        if service == 'crop_recommendation':
+            try:
+                soil_data = json.loads(args[1]) if isinstance(args[1], str) else args[1]
+            except json.JSONDecodeError:
+                return None
+            return soil_data if crop_recommendation.validate_soil_data(soil_data) else None
+        if service == 'price_prediction':
+            if len(args) < 3 or not price_prediction.validate_input(args[1], args[2]):
+                return None
+            response_format = args[3] if len(args) > 3 else 'rows'
+            if response_format not in price_prediction.RESPONSE_FORMATS:
+                return None
+            return (args[1], int(args[2]), response_format)
+        if service == 'stock_prediction':
+            try:
+                payload = json.loads(args[1]) if isinstance(args[1], str) else args[1]
+            except json.JSONDecodeError:
+                return None
+            if not isinstance(payload, dict) or payload.get('trend_model', 'sklearn') not in stock_prediction.TREND_MODELS:
+                return None
+            return payload
+        return None
+
+    async def dispatch(self, service: Optional[str], args: list) -> Dict[str, Any]:
+        name = self.server.resolve_service(service) if service is not None else None
+        item = self.batch_item(name, args) if name in self.batchers else None
+        if item is None:
+            if service is None and args and args[0] == 'health':
+                result = await self._run(self.server.health)
+                result['batching'] = {name: b.stats() for name, b in self.batchers.items()}
+                return result
+            return await self._run(self.server.dispatch, service, args)
+        result = await self.batchers[name].submit(item)
+        telemetry.count('requests_total', service=name, command='predict')
+        if not result.get('success', False):
+            telemetry.count('request_errors_total', service=name, command='predict')
+        return result
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def handle_line(self, line: str) -> Optional[str]:
+        """Async counterpart of ModelServer.handle_line."""
+        line = line.strip()
+        if not line:
+            return None
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Request must be a JSON object')
+            if request.get('debug'):
+                # Stage timings are per thread, so debug requests skip batching
+                return await self._run(self.server.handle_line, line)
+            request_id = request.get('id')
+            args = request.get('args') or []
+            if not isinstance(args, list):
+                raise ValueError('args must be a list')
+            result = await self.dispatch(request.get('service'), args)
+        except (json.JSONDecodeError, ValueError) as e:
+            result = {'success': False, 'error': f'Invalid request: {e}'}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        return '{"id": %s, "result": %s}' % (json.dumps(request_id), telemetry.dumps(result))
+
+    async def _serve_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+
+        async def respond(raw: bytes):
+            response = await self.handle_line(raw.decode('utf-8'))
+            if response is None:
+                return
+            async with lock:
+                writer.write((response + '\n').encode('utf-8'))
+                await writer.drain()
+
+        # Requests on one connection are handled concurrently; callers match responses by id
+        tasks = set()
+        try:
+            while True:
+                raw, oversized = await read_line(reader)
+                if oversized:
+                    error = {'success': False, 'error': f'Invalid request: line exceeds {MAX_LINE_BYTES} bytes'}
+                    async with lock:
+                        writer.write(('{"id": null, "result": %s}\n' % json.dumps(error)).encode('utf-8'))
+                        await writer.drain()
+                    continue
+                if not raw:
+                    break
+                task = asyncio.ensure_future(respond(raw))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host: str, port: int):
+        server = await asyncio.start_server(self._serve_stream, host, port, limit=MAX_LINE_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_unix(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self._serve_stream, path, limit=MAX_LINE_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        await self._serve_stream(reader, writer)
+
@@ -0,0 +1,215 @@
+"""
+Versioned on-disk store for trained ML models.
+
+Each artifact is saved as an envelope {'format_version', 'key', 'model'} where
+`key` is a fingerprint of the training config and training data. load_or_train
+returns the stored model when the key still matches and retrains otherwise.
+Writes go to a temporary file in the same directory followed by os.replace, so
+concurrent readers only ever see a complete file.
+
+Set ML_MODELS_DIR to relocate the store. ML_MODEL_MMAP_MODE is passed to
+joblib.load as mmap_mode: plain numpy arrays stored in an artifact are then
+mapped instead of read, but sklearn tree estimators copy their node and value
+arrays into private buffers when unpickled, so forests are not shared this way.
+Cross-process sharing of forest arrays comes from compact_forest (which also
+uses this mode for its .npy files, default 'r') and the pre-fork server.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from telemetry import timed
+
+
+FORMAT_VERSION = 1
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+def fingerprint(config: Dict[str, Any], *arrays: Any) -> str:
+    """Stable hash of a JSON-serializable training config plus any training arrays."""
+    import numpy as np
+    import sklearn
+
+    h = hashlib.sha256()
+    h.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+    h.update(sklearn.__version__.encode('utf-8'))
+    for arr in arrays:
+        arr = np.ascontiguousarray(np.asarray(arr))
+        h.update(str(arr.dtype).encode('utf-8'))
+        h.update(str(arr.shape).encode('utf-8'))
+        if arr.dtype == object:
+            h.update(json.dumps(arr.tolist(), default=str).encode('utf-8'))
+        else:
+            h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root: Optional[str] = None, mmap_mode: Optional[str] = None):
+        self.root = root or os.environ.get('ML_MODELS_DIR') or DEFAULT_MODELS_DIR
+        self.mmap_mode = mmap_mode if mmap_mode is not None else (os.environ.get('ML_MODEL_MMAP_MODE') or None)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    @timed('registry.load')
+    def load(self, name: str, key: str) -> Optional[Any]:
+        """Return the stored model if it exists, is readable and was trained under `key`."""
+        import joblib
+
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            envelope = joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception:
+            return None
+        if not isinstance(envelope, dict):
+            return None
+        if envelope.get('format_version') != FORMAT_VERSION or envelope.get('key') != key:
+            return None
+        return envelope.get('model')
+
+    @timed('registry.save')
+    def save(self, name: str, key: str, model: Any) -> str:
+        """Atomically write `model` under `name`; returns the final path."""
+        import joblib
+
+        return self._write_atomic(
+            name, lambda f: joblib.dump({'format_version': FORMAT_VERSION, 'key': key, 'model': model}, f)
+        )
+
+    def save_json(self, name: str, data: Any) -> str:
+        """Atomically write a JSON document (e.g. a training manifest) under `name`."""
+        return self._write_atomic(name, lambda f: f.write(json.dumps(data, indent=2).encode('utf-8')))
+
+    def load_json(self, name: str) -> Optional[Any]:
+        try:
+            with open(self.path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, name: str, write: Callable[[Any], Any]) -> str:
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates 0600 files; let other worker users read the artifact
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    def load_or_train(self, name: str, key: str, train: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (model, loaded_from_disk). Trains and persists only when no valid artifact matches `key`."""
+        model = self.load(name, key)
+        if model is not None:
+            return model, True
+        model = train()
+        try:
+            self.save(name, key, model)
+        except OSError:
+            # Read-only or full disk: serve the freshly trained model anyway
+            pass
+        return model, False
+
+
+class BundleStore(Mapping):
+    """
+    Read-only mapping of name -> model bundle where each bundle is its own artifact.
+    Bundles are loaded (or trained and saved) individually on first access, so asking
+    for one entry never deserializes the others. `keys` maps each name to its training
+    fingerprint and `train(name)` builds a bundle when no valid artifact exists.
+    """
+
+    def __init__(self, registry: ModelRegistry, directory: str, keys: Dict[str, str],
+                 train: Callable[[str], Any]):
+        self.registry = registry
+        self.directory = directory
+        self.keys = dict(keys)
+        self._train = train
+        self._bundles: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.loaded_from_cache: Dict[str, bool] = {}
+
+    def artifact_name(self, name: str) -> str:
+        safe = name.replace(os.sep, '_').replace('/', '_')
+        return os.path.join(self.directory, f'{safe}.joblib')
+
+    def __getitem__(self, name: str) -> Any:
+        bundle = self._bundles.get(name)
+        if bundle is not None:
+            return bundle
+        if name not in self.keys:
+            raise KeyError(name)
+        with self._lock:
+            bundle = self._bundles.get(name)
+            if bundle is None:
+                bundle, cached = self.registry.load_or_train(
+                    self.artifact_name(name), self.keys[name], lambda: self._train(name)
+                )
+                self._bundles[name] = bundle
+                self.loaded_from_cache[name] = cached
+        return bundle
+
+    def __contains__(self, name: object) -> bool:
+        # Membership must not trigger a load
+        return name in self.keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def loaded(self) -> List[str]:
+        return list(self._bundles)
+
+    def replace(self, name: str, key: str, bundle: Any):
+        """Swap in a new bundle for `name`; readers see either the old or the new bundle, never a mix."""
+        with self._lock:
+            self.keys[name] = key
+            self._bundles[name] = bundle
+
+    def load_existing(self, names: Optional[List[str]] = None) -> List[str]:
+        """Load every listed bundle that has a valid artifact; return the names that still need training."""
+        missing = []
+        for name in names or list(self.keys):
+            if name in self._bundles:
+                continue
+            bundle = self.registry.load(self.artifact_name(name), self.keys[name])
+            if bundle is None:
+                missing.append(name)
+                continue
+            with self._lock:
+                self._bundles.setdefault(name, bundle)
+                self.loaded_from_cache[name] = True
+        return missing
+
+    def add_trained(self, name: str, bundle: Any):
+        """Persist and install a bundle that was trained outside the store under the current key."""
+        try:
+            self.registry.save(self.artifact_name(name), self.keys[name], bundle)
+        except OSError:
+            # Read-only or full disk: serve the freshly trained bundle anyway
+            pass
+        with self._lock:
+            self._bundles[name] = bundle
+            self.loaded_from_cache[name] = False
+
+    def preload(self, names: Optional[List[str]] = None):
+        for name in names or list(self.keys):
+            self[name]
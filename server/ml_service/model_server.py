@@ -0,0 +1,212 @@
+"""
+Long-lived model server for the ML service scripts.
+
+Loads CropRecommendationSystem and PricePredictionSystem once and answers
+requests over a JSON-lines protocol on stdin/stdout or a local socket, so
+callers no longer pay interpreter start-up and model training per query.
+
+Request (one JSON object per line):
+    {"id": 1, "service": "crop_recommendation", "args": ["predict", {"N": 90, ...}]}
+    {"id": 2, "service": "price_prediction", "args": ["predict", "rice", 30]}
+    {"id": 3, "service": "stock_prediction", "args": ["predict", {...}]}
+    {"id": 4, "args": ["health"]}
+
+Response (one JSON object per line):
+    {"id": 1, "result": {...}}
+
+Add "debug": true to a request (or set ML_DEBUG_TIMINGS=1) to get per-stage
+timings in result["timings"]. Request counters and stage histograms are kept
+unless ML_METRICS=0 and are returned by {"args": ["metrics"]}, including a
+Prometheus text rendering.
+
+`args` mirrors the CLI argv of each script and `result` is exactly what that
+script's main() would print, so response shapes are unchanged.
+
+Usage:
+    python model_server.py                      # stdin/stdout
+    python model_server.py --port 8765          # TCP on 127.0.0.1
+    python model_server.py --unix /tmp/ml.sock  # UNIX domain socket
+    python model_server.py --batch --port 8765  # micro-batch concurrent predicts (micro_batching.py)
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+from typing import Any, Dict, IO, Optional
+
+import crop_recommendation
+import price_prediction
+import stock_prediction
+import telemetry
+
+
+SERVICE_ALIASES = {
+    'crop': 'crop_recommendation',
+    'price': 'price_prediction',
+    'stock': 'stock_prediction',
+}
+
+
+class ModelServer:
+    """Holds the trained predictors and dispatches requests to each script's run_command."""
+
+    def __init__(self):
+        # Metrics are cheap next to model inference, so the long-lived server keeps them by default
+        telemetry.configure(metrics_enabled=os.environ.get('ML_METRICS', '1').lower() not in ('0', 'false', 'no', 'off'))
+        self.recommender = crop_recommendation.CropRecommendationSystem()
+        self.price_predictor = price_prediction.PricePredictionSystem(preload=True)
+
+    def dispatch(self, service: Optional[str], args: list) -> Dict[str, Any]:
+        if service is None:
+            if args and args[0] == 'health':
+                return self.health()
+            if args and args[0] == 'metrics':
+                return telemetry.metrics_response()
+            return {'success': False, 'error': 'No service provided'}
+
+        service = self.resolve_service(service)
+        command = str(args[0]) if args else ''
+        with telemetry.span(f'request.{service}'):
+            result = self._dispatch_service(service, args)
+        telemetry.count('requests_total', service=service, command=command)
+        if not result.get('success', False):
+            telemetry.count('request_errors_total', service=service, command=command)
+        return result
+
+    @staticmethod
+    def resolve_service(service: str) -> str:
+        service = SERVICE_ALIASES.get(service, service)
+        return service[:-3] if service.endswith('.py') else service
+
+    def _dispatch_service(self, service: str, args: list) -> Dict[str, Any]:
+
+        if service == 'crop_recommendation':
+            return crop_recommendation.run_command(args, self.recommender)
+        if service == 'price_prediction':
+            return price_prediction.run_command(args, self.price_predictor)
+        if service == 'stock_prediction':
+            return stock_prediction.run_command(args)
+        return {'success': False, 'error': f'Unknown service: {service}'}
+
+    def health(self) -> Dict[str, Any]:
+        services = {
+            'crop_recommendation': crop_recommendation.run_command(['health'], self.recommender),
+            'price_prediction': price_prediction.run_command(['health'], self.price_predictor),
+            'stock_prediction': stock_prediction.run_command(['health']),
+        }
+        healthy = all(r.get('success') for r in services.values())
+        return {
+            'success': healthy,
+            'status': 'healthy' if healthy else 'unhealthy',
+            'services': services,
+            'cache': {
+                'crop_recommendation': self.recommender.cache.stats(),
+                'price_prediction': self.price_predictor.cache.stats(),
+                'stock_prediction': stock_prediction.forecast_cache.stats(),
+            },
+            'metrics': telemetry.metrics.snapshot() if telemetry.metrics_enabled() else None,
+        }
+
+    def handle_line(self, line: str) -> Optional[str]:
+        """Decode one request line and return the encoded response line (None for blank input)."""
+        line = line.strip()
+        if not line:
+            return None
+        request_id = None
+        timings = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Request must be a JSON object')
+            request_id = request.get('id')
+            args = request.get('args') or []
+            if not isinstance(args, list):
+                raise ValueError('args must be a list')
+            with telemetry.request_timings(True if request.get('debug') else None) as timings:
+                result = self.dispatch(request.get('service'), args)
+        except (json.JSONDecodeError, ValueError) as e:
+            result = {'success': False, 'error': f'Invalid request: {e}'}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        return '{"id": %s, "result": %s}' % (json.dumps(request_id), telemetry.dumps(result, timings))
+
+    def serve_stdio(self, stdin: IO[str] = sys.stdin, stdout: IO[str] = sys.stdout):
+        for line in stdin:
+            response = self.handle_line(line)
+            if response is None:
+                continue
+            stdout.write(response + '\n')
+            stdout.flush()
+
+    def make_handler(self):
+        server = self
+
+        class _LineHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    response = server.handle_line(raw.decode('utf-8'))
+                    if response is None:
+                        continue
+                    self.wfile.write((response + '\n').encode('utf-8'))
+                    self.wfile.flush()
+
+        return _LineHandler
+
+    def serve_tcp(self, host: str, port: int):
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((host, port), self.make_handler()) as srv:
+            srv.daemon_threads = True
+            srv.serve_forever()
+
+    def serve_unix(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        with socketserver.ThreadingUnixStreamServer(path, self.make_handler()) as srv:
+            srv.daemon_threads = True
+            srv.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Persistent ML model server (JSON lines)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='Serve over TCP instead of stdin/stdout')
+    parser.add_argument('--unix', default=None, help='Serve over a UNIX domain socket at this path')
+    parser.add_argument('--batch', action='store_true',
+                        help='Use the asyncio front end that micro-batches concurrent predict requests')
+    parser.add_argument('--batch-size', type=int, default=None, help='Largest micro-batch (default ML_BATCH_SIZE or 32)')
+    parser.add_argument('--max-wait-ms', type=float, default=None,
+                        help='Longest a request waits for its batch to fill (default ML_BATCH_WAIT_MS or 5)')
+    opts = parser.parse_args()
+
+    server = ModelServer()
+    # Signal readiness so supervisors know training/loading has finished
+    print(json.dumps({'id': None, 'result': {'success': True, 'status': 'ready'}}), flush=True)
+
+    if opts.batch:
+        import asyncio
+        import micro_batching
+
+        frontend = micro_batching.BatchingFrontend(
+            server,
+            opts.batch_size if opts.batch_size is not None else micro_batching.DEFAULT_BATCH_SIZE,
+            opts.max_wait_ms if opts.max_wait_ms is not None else micro_batching.DEFAULT_MAX_WAIT_MS
+        )
+        if opts.unix:
+            asyncio.run(frontend.serve_unix(opts.unix))
+        elif opts.port is not None:
+            asyncio.run(frontend.serve_tcp(opts.host, opts.port))
+        else:
+            asyncio.run(frontend.serve_stdio())
+        return
+
+    if opts.unix:
+        server.serve_unix(opts.unix)
+    elif opts.port is not None:
+        server.serve_tcp(opts.host, opts.port)
+    else:
+        server.serve_stdio()
+
+
+if __name__ == '__main__':
+    main()
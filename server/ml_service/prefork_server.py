@@ -0,0 +1,170 @@
+"""
+Pre-fork model server: load the models once, share them with N workers.
+
+The parent builds a ModelServer (crop RandomForest plus every per-crop price
+model, preloaded), freezes the garbage collector so the loaded objects are never
+rewritten by collections, binds the listening socket and forks the workers.
+Each worker serves the usual JSON-lines protocol (see model_server.py) on the
+inherited socket. Model memory stays in pages shared copy-on-write with the
+parent: prediction only reads the tree arrays, so only a small private working
+set is added per worker and total memory grows far slower than one
+model_server.py process per worker.
+
+{"args": ["memory"]} reports RSS, PSS and private memory for the parent and
+every worker (Linux /proc). Dead workers are re-forked from the parent, which
+still holds the pristine models. `ingest` is refused here: an update would
+only reach the worker that received it, so feed new prices through the CLI or
+a single model_server.py and restart the pool to pick them up.
+
+Usage:
+    python prefork_server.py --workers 4 --port 8765
+    python prefork_server.py --workers 4 --unix /tmp/ml.sock
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from typing import Any, Dict, List, Optional
+
+from model_server import ModelServer
+
+
+def process_memory(pid: int) -> Optional[Dict[str, float]]:
+    """RSS/PSS/shared/private memory of a process in MB from /proc, or None if unavailable."""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    return {
+        'rss_mb': round(fields.get('Rss', 0.0), 1),
+        'pss_mb': round(fields.get('Pss', 0.0), 1),
+        'shared_mb': round(fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0), 1),
+        'private_mb': round(fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0), 1)
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def pool_memory(parent_pid: int) -> Dict[str, Any]:
+    """Memory of the parent and all of its workers; total PSS is the pool's real footprint."""
+    processes = []
+    for role, pid in [('parent', parent_pid)] + [('worker', p) for p in child_pids(parent_pid)]:
+        usage = process_memory(pid)
+        if usage is not None:
+            processes.append({'pid': pid, 'role': role, **usage})
+    return {
+        'processes': processes,
+        'workers': sum(p['role'] == 'worker' for p in processes),
+        'total_rss_mb': round(sum(p['rss_mb'] for p in processes), 1),
+        'total_pss_mb': round(sum(p['pss_mb'] for p in processes), 1)
+    }
+
+
+class PreforkModelServer(ModelServer):
+    """ModelServer for forked workers: adds the `memory` command and refuses per-worker model updates."""
+
+    def __init__(self):
+        super().__init__()
+        self.parent_pid = os.getpid()
+
+    def dispatch(self, service: Optional[str], args: list) -> Dict[str, Any]:
+        if service is None and args and args[0] == 'memory':
+            return {'success': True, 'worker_pid': os.getpid(), **pool_memory(self.parent_pid)}
+        if args and args[0] in ('ingest', 'ingest-many'):
+            return {'success': False, 'error': 'ingest is not supported by the pre-fork server'}
+        return super().dispatch(service, args)
+
+
+def bind_listener(host: str, port: Optional[int], unix_path: Optional[str]) -> socket.socket:
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(unix_path)
+    else:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+    listener.listen(128)
+    # Every worker polls the same socket; losers of an accept race just go back to waiting
+    listener.setblocking(False)
+    return listener
+
+
+def serve_worker(server: PreforkModelServer, listener: socket.socket):
+    server_class = (socketserver.ThreadingUnixStreamServer if listener.family == socket.AF_UNIX
+                    else socketserver.ThreadingTCPServer)
+    srv = server_class(listener.getsockname(), server.make_handler(), bind_and_activate=False)
+    srv.socket.close()
+    srv.socket = listener
+    srv.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    srv.serve_forever()
+
+
+def fork_worker(server: PreforkModelServer, listener: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve_worker(server, listener)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-fork ML model server sharing models copy-on-write')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--unix', default=None, help='Serve over a UNIX domain socket at this path')
+    opts = parser.parse_args()
+    if opts.port is None and not opts.unix:
+        parser.error('one of --port or --unix is required')
+
+    server = PreforkModelServer()
+    # Move everything loaded so far out of the collector's reach: collections in the
+    # workers would otherwise write to every object header and un-share those pages
+    gc.collect()
+    gc.freeze()
+
+    listener = bind_listener(opts.host, opts.port, opts.unix)
+    workers = {fork_worker(server, listener) for _ in range(max(1, opts.workers))}
+
+    def stop(*_):
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(json.dumps({'id': None, 'result': {'success': True, 'status': 'ready', 'workers': sorted(workers)}}),
+          flush=True)
+
+    while True:
+        pid, _ = os.wait()
+        if pid in workers:
+            workers.discard(pid)
+            workers.add(fork_worker(server, listener))
+
+
+if __name__ == '__main__':
+    main()
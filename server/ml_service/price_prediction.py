@@ -1,14 +1,45 @@
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
-import joblib
+from __future__ import annotations
+
+import copy
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 import sys
 import json
+import zlib
 from typing import Dict, List, Union, Optional
 
+from forecast_cache import ForecastCache
+from history_store import PriceHistoryStore
+from lazy_imports import LazyModule, missing_modules
+from model_registry import BundleStore, ModelRegistry, fingerprint
+from serialization import RESPONSE_FORMATS, format_dates, to_layout, validate_format
+from telemetry import cli_response, metrics_response, span, timed
+
+# Heavy libraries load on first use so health/factors answer without importing them
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+
+REQUIRED_MODULES = ('numpy', 'pandas', 'sklearn', 'joblib')
+# Commands that need trained models (everything else is answered statically)
+MODEL_COMMANDS = ('health', 'predict', 'cache-stats', 'forecast-bulk', 'ingest', 'ingest-many', 'train')
+
+PRICE_FACTORS = {
+    'rice': [
+        {'factor': 'Seasonal demand', 'impact': 'High'},
+        {'factor': 'Monsoon conditions', 'impact': 'High'},
+        {'factor': 'Global supply', 'impact': 'Medium'},
+        {'factor': 'Government policies', 'impact': 'High'}
+    ],
+    'wheat': [
+        {'factor': 'Winter crop yield', 'impact': 'High'},
+        {'factor': 'International prices', 'impact': 'Medium'},
+        {'factor': 'Storage conditions', 'impact': 'Medium'}
+    ]
+    # Add more crops
+}
+
 def validate_input(crop: str, days: int) -> bool:
     """Validate input parameters"""
     if not isinstance(crop, str) or len(crop) == 0:
@@ -21,70 +52,370 @@ def validate_input(crop: str, days: int) -> bool:
         return False
     return True
 
+PRICE_MODELS_DIR = 'price_prediction_models'
+TRAINING_MANIFEST = os.path.join(PRICE_MODELS_DIR, 'training_manifest.json')
+# Processes used to train missing crop models at preload (joblib semantics: -1 = all cores)
+DEFAULT_TRAIN_JOBS = int(os.environ.get('ML_TRAIN_JOBS', 1))
+PRICE_FEATURES = ['month', 'day_of_week', 'season']
+# Crops known only from ingested prices get a model once they have this many days
+MIN_TRAINING_ROWS = 30
+PRICE_MODEL_CONFIG = {
+    'model': 'GradientBoostingRegressor',
+    'n_estimators': 100,
+    'random_state': 42,
+    'features': PRICE_FEATURES,
+    # Per-day 95% intervals: forward-chained out-of-sample residuals, one conformal quantile per month
+    'interval': {'method': 'time_split_conformal', 'folds': 5, 'calibration_days': 365, 'coverage': 0.95, 'group': 'month'}
+}
+# Months with fewer calibration residuals than this use the crop-wide quantile
+MIN_INTERVAL_RESIDUALS = 20
+
+def crop_rng(seed: Optional[int], crop: str):
+    """Independent random stream per crop, so adding a crop leaves the others' data unchanged."""
+    return np.random.default_rng(None if seed is None else [seed, zlib.crc32(crop.encode('utf-8'))])
+
+def generate_price_history(crops: List[str], start_date: str, end_date: str, seed: Optional[int] = 42) -> pd.DataFrame:
+    """
+    Build synthetic daily price history for every (crop, date) pair in one batched pass.
+    Rows are ordered crop-major, then by date, with columns
+    date, crop, price, month, day_of_week, season.
+    """
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    n_crops, n_days = len(crops), len(dates)
+
+    month = dates.month.values.astype(np.int64)
+    day_of_week = dates.dayofweek.values.astype(np.int64)
+    season = (month % 12 + 3) // 3
+
+    # Seasonal variation and upward trend are shared by all crops; base price and noise are per crop
+    seasonal_factor = np.sin(2 * np.pi * month / 12) * 5
+    trend = 0.01 * np.arange(n_days)
+    base_price = np.empty((n_crops, 1))
+    noise = np.empty((n_crops, n_days))
+    for i, crop in enumerate(crops):
+        rng = crop_rng(seed, crop)
+        base_price[i] = rng.uniform(20, 100)
+        noise[i] = rng.normal(0, 2, size=n_days)
+
+    price = np.maximum(base_price + seasonal_factor + trend + noise, 10)  # Ensure price doesn't go too low
+
+    return pd.DataFrame({
+        'date': np.tile(dates.values, n_crops),
+        'crop': np.repeat(np.asarray(crops, dtype=object), n_days),
+        'price': price.ravel(),
+        'month': np.tile(month, n_crops),
+        'day_of_week': np.tile(day_of_week, n_crops),
+        'season': np.tile(season, n_crops)
+    })
+
+def features_for_dates(dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """Calendar features (month, day_of_week, season) for a DatetimeIndex."""
+    month = np.asarray(dates.month, dtype=np.int64)
+    return pd.DataFrame({
+        'month': month,
+        'day_of_week': np.asarray(dates.dayofweek, dtype=np.int64),
+        'season': (month % 12 + 3) // 3
+    })
+
+def parse_price_observations(observations) -> pd.DataFrame:
+    """
+    Parse new market prices given as [{date, price}] records or {dates: [...], prices: [...]}.
+    Rows with an unparseable date or a missing/non-positive price are dropped.
+    Returns DataFrame(date, price) sorted by date, last value winning per date.
+    """
+    if isinstance(observations, dict):
+        dates, prices = observations.get('dates') or [], observations.get('prices') or []
+        if len(dates) != len(prices):
+            raise ValueError('dates and prices must have the same length')
+    elif isinstance(observations, list):
+        records = [rec if isinstance(rec, dict) else {} for rec in observations]
+        dates = [rec.get('date') for rec in records]
+        prices = [rec.get('price') for rec in records]
+    else:
+        raise ValueError('observations must be a list')
+    df = pd.DataFrame({
+        'date': pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce', format='ISO8601').dt.normalize(),
+        'price': pd.to_numeric(pd.Series(prices, dtype=object), errors='coerce').astype(float)
+    })
+    df = df[df['date'].notna() & (df['price'] > 0)]
+    return df.drop_duplicates('date', keep='last').sort_values('date', ignore_index=True)
+
+def merge_observations(crop: str, base: Optional[pd.DataFrame], observed: pd.DataFrame) -> pd.DataFrame:
+    """Append observed prices (with calendar features) to a crop's training frame; observations win on date clashes."""
+    observed = observed.reset_index(drop=True)
+    rows = pd.concat([
+        observed[['date']],
+        pd.DataFrame({'crop': crop, 'price': observed['price'].astype(float)}),
+        features_for_dates(pd.DatetimeIndex(observed['date']))
+    ], axis=1)
+    if base is not None and len(base):
+        rows = pd.concat([base, rows], ignore_index=True)
+    return rows.drop_duplicates('date', keep='last').sort_values('date', ignore_index=True)
+
+def update_crop_model(bundle: Optional[Dict], crop_data: pd.DataFrame, extra_estimators: int = 20,
+                      window_days: int = 730, max_estimators: int = 300):
+    """
+    Fold new data into a crop model without touching other crops.
+    Adds extra_estimators boosting stages (warm start) fitted on the most recent window_days;
+    once the ensemble would exceed max_estimators, refits a fresh model on that window instead.
+    Returns (bundle, mode) with mode 'warm_start' or 'refit'.
+    """
+    window = crop_data[crop_data['date'] > crop_data['date'].max() - pd.Timedelta(days=window_days)]
+    if bundle is None or bundle['model'].n_estimators + extra_estimators > max_estimators:
+        return train_crop_model(window), 'refit'
+
+    # Work on a copy so the serving bundle stays untouched until it is swapped out
+    model = copy.deepcopy(bundle['model'])
+    scaler = bundle['scaler']
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_estimators)
+    model.fit(scaler.transform(window[PRICE_FEATURES]), window['price'])
+    model.set_params(warm_start=False)
+    # A few extra stages barely move the fit, so the calibrated widths carry over until the next refit
+    return {
+        'model': model,
+        'scaler': scaler,
+        'intervals': bundle.get('intervals')
+    }, 'warm_start'
+
+def crop_model_key(crop: str, crop_data: pd.DataFrame) -> str:
+    return fingerprint({**PRICE_MODEL_CONFIG, 'crop': crop}, crop_data[PRICE_FEATURES].values, crop_data['price'].values)
+
+def new_price_model():
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    return GradientBoostingRegressor(n_estimators=PRICE_MODEL_CONFIG['n_estimators'],
+                                     random_state=PRICE_MODEL_CONFIG['random_state'])
+
+def conformal_quantile(residuals: np.ndarray, coverage: float) -> float:
+    """Split-conformal quantile: the ceil((n+1)*coverage)-th smallest residual (the largest if n is small)."""
+    ordered = np.sort(residuals)
+    rank = int(np.ceil((len(ordered) + 1) * coverage))
+    return float(ordered[min(rank, len(ordered)) - 1])
+
+def conformal_intervals(X_scaled: np.ndarray, y: np.ndarray, months: np.ndarray) -> Optional[Dict]:
+    """
+    Calibrate per-month interval half-widths for a crop model from date-ordered rows.
+    Each later block of days is predicted by a model fitted only on the days before it, so the
+    residuals include the drift a real forecast sees; the conformal quantile of those absolute
+    residuals, taken per month, is the half-width for that month. None if too few rows.
+    """
+    from sklearn.model_selection import TimeSeriesSplit
+
+    config = PRICE_MODEL_CONFIG['interval']
+    if len(y) <= 2 * config['folds']:
+        return None
+    residuals, cal_months = [], []
+    # Calibrate on the most recent days so fold models see nearly as much history as the final one
+    test_size = max(1, min(config['calibration_days'], len(y) // 2) // config['folds'])
+    for fit_idx, cal_idx in TimeSeriesSplit(n_splits=config['folds'], test_size=test_size).split(X_scaled):
+        model = new_price_model()
+        model.fit(X_scaled[fit_idx], y[fit_idx])
+        residuals.append(np.abs(y[cal_idx] - model.predict(X_scaled[cal_idx])))
+        cal_months.append(months[cal_idx])
+    residuals, months = np.concatenate(residuals), np.concatenate(cal_months)
+
+    overall = conformal_quantile(residuals, config['coverage'])
+    by_month = np.full(13, overall)  # indexed by month number; slot 0 unused
+    for month in range(1, 13):
+        in_month = residuals[months == month]
+        if len(in_month) >= MIN_INTERVAL_RESIDUALS:
+            by_month[month] = conformal_quantile(in_month, config['coverage'])
+    return {
+        'method': config['method'],
+        'coverage': config['coverage'],
+        'half_width_by_month': by_month
+    }
+
+def interval_half_widths(bundle: Dict, months: np.ndarray) -> Optional[np.ndarray]:
+    """Per-day half-widths for forecast days in the given months, or None for an uncalibrated bundle."""
+    intervals = bundle.get('intervals')
+    if intervals is None:
+        return None
+    return intervals['half_width_by_month'][np.asarray(months, dtype=np.int64)]
+
+def train_crop_model(crop_data: pd.DataFrame) -> Dict:
+    """Fit one crop's model bundle; each bundle owns its own scaler and interval calibration."""
+    from sklearn.preprocessing import StandardScaler
+
+    # Create features
+    X = crop_data[PRICE_FEATURES]
+    y = crop_data['price']
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train model
+    model = new_price_model()
+    model.fit(X_scaled, y)
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'intervals': conformal_intervals(X_scaled, y.to_numpy(dtype=float), crop_data['month'].to_numpy())
+    }
+
+def train_crop_model_timed(crop_data: pd.DataFrame):
+    """train_crop_model plus its fit time; module-level so worker processes can run it."""
+    # Import first so a fresh worker's sklearn import is not billed to its first crop
+    import sklearn.ensemble  # noqa: F401
+
+    start = time.perf_counter()
+    bundle = train_crop_model(crop_data)
+    return bundle, time.perf_counter() - start
+
+def calendar_features(days_ahead: int, start: Optional[datetime] = None):
+    """Return (dates, feature frame) for the next days_ahead days; features depend only on the calendar."""
+    dates = pd.date_range(start=start or datetime.now(), periods=days_ahead, freq='D')
+    return dates, features_for_dates(dates)
+
+def price_response(dates: pd.DatetimeIndex, predictions: np.ndarray, response_format: str = 'rows',
+                   half_widths: Optional[np.ndarray] = None) -> Dict:
+    """
+    Build the predict response for one crop from forecast dates and predicted prices.
+    half_widths are the calibrated per-day interval half-widths (see conformal_intervals);
+    confidence_interval reports their mean. Without them the spread of the forecast is used.
+    response_format 'rows' gives one dict per day; 'columns' gives one list per field.
+    """
+    prices = np.asarray(predictions, dtype=float)
+    if half_widths is None:
+        half_widths = np.full(len(prices), 1.96 * np.std(prices))
+    confidence_interval = float(np.mean(half_widths)) if len(prices) else 0.0
+    lower = prices - half_widths
+
+    response = {
+        'success': True,
+        'predictions': to_layout({
+            'date': format_dates(dates),
+            'price': prices.tolist(),
+            'lower_bound': np.where(lower > 0, lower, 0.0).tolist(),
+            'upper_bound': (prices + half_widths).tolist()
+        }, response_format),
+        'average_price': float(np.mean(prices)),
+        'confidence_interval': confidence_interval
+    }
+    if response_format == 'columns':
+        response['format'] = 'columns'
+    return response
+
+
 class PricePredictionSystem:
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None, seed: int = 42,
+                 cache: Optional[ForecastCache] = None, preload: bool = False,
+                 history: Optional[PriceHistoryStore] = None, n_jobs: Optional[int] = None):
         self.model = None
-        self.scaler = StandardScaler()
+        self.n_jobs = DEFAULT_TRAIN_JOBS if n_jobs is None else n_jobs
+        self._manifest_lock = threading.Lock()
+        self.registry = registry or ModelRegistry()
+        self.cache = cache or ForecastCache()
+        self.history = history or PriceHistoryStore()
+        self._update_lock = threading.Lock()
+        self.seed = seed
+        self.crops = ['rice', 'wheat', 'tomatoes', 'potatoes', 'onions']
+        self.start_date = '2024-01-01'
+        self.end_date = '2025-08-05'
         self.initialize_model()
+        if preload:
+            self.train_models()
+
+    def generate_training_data(self) -> pd.DataFrame:
+        return generate_price_history(self.crops, self.start_date, self.end_date, seed=self.seed)
 
     def initialize_model(self):
-        # Generate sample historical price data
-        dates = pd.date_range(start='2024-01-01', end='2025-08-05', freq='D')
-        crops = ['rice', 'wheat', 'tomatoes', 'potatoes', 'onions']
-        
-        data = []
-        for crop in crops:
-            base_price = np.random.uniform(20, 100)
-            for date in dates:
-                # Add seasonal variations and trends
-                month = date.month
-                seasonal_factor = np.sin(2 * np.pi * month / 12) * 5
-                trend = 0.01 * (date - dates[0]).days
-                noise = np.random.normal(0, 2)
-                
-                price = base_price + seasonal_factor + trend + noise
-                
-                data.append({
-                    'date': date,
-                    'crop': crop,
-                    'price': max(price, 10),  # Ensure price doesn't go too low
-                    'month': month,
-                    'day_of_week': date.dayofweek,
-                    'season': (month % 12 + 3) // 3
-                })
-
-        df = pd.DataFrame(data)
-        
-        # Train separate model for each crop
-        self.models = {}
-        for crop in crops:
-            crop_data = df[df['crop'] == crop].copy()
-            
-            # Create features
-            X = crop_data[['month', 'day_of_week', 'season']]
-            y = crop_data['price']
-            
-            # Scale features
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Train model
-            model = GradientBoostingRegressor(n_estimators=100, random_state=42)
-            model.fit(X_scaled, y)
-            
-            self.models[crop] = {
-                'model': model,
-                'scaler': self.scaler
+        with span('price.initialize.generate_data'):
+            df = self.generate_training_data()
+            self.training_data = {crop: crop_data for crop, crop_data in df.groupby('crop', sort=False)}
+        # Fold in market prices ingested since the synthetic baseline
+        with span('price.initialize.merge_history'):
+            for crop in self.history.crops():
+                self.training_data[crop] = merge_observations(crop, self.training_data.get(crop), self.history.read(crop))
+        self.training_data = {crop: data for crop, data in self.training_data.items() if len(data) >= MIN_TRAINING_ROWS}
+
+        # One artifact per crop: a request for rice loads (or trains) only the rice model,
+        # and a crop is retrained only when its own config or data fingerprint changes
+        with span('price.initialize.fingerprint'):
+            keys = {crop: crop_model_key(crop, crop_data) for crop, crop_data in self.training_data.items()}
+        self.models = BundleStore(self.registry, PRICE_MODELS_DIR, keys, self._train_crop)
+        self.cache.invalidate()
+
+    def _train_crop(self, crop: str) -> Dict:
+        with span('price.train'):
+            bundle, seconds = train_crop_model_timed(self.training_data[crop])
+        self._record_training({crop: seconds}, n_jobs=1)
+        return bundle
+
+    def train_models(self, crops: Optional[List[str]] = None, n_jobs: Optional[int] = None) -> Dict:
+        """
+        Make every crop model available: load valid artifacts, then train the rest in parallel.
+        Crops are independent, so missing models are fitted in n_jobs worker processes
+        (default self.n_jobs); per-crop fit times go to the training manifest.
+        Returns {'loaded': [...], 'trained': [...], 'wall_seconds': float}.
+        """
+        import joblib
+
+        n_jobs = self.n_jobs if n_jobs is None else n_jobs
+        start = time.perf_counter()
+        crops = [c for c in (crops or list(self.models)) if c in self.models]
+        with span('price.train_models.load'):
+            missing = self.models.load_existing(crops)
+        if missing:
+            # Never start more processes than there are cores or crops to fit; 1 runs inline
+            n_jobs = max(1, min(joblib.effective_n_jobs(n_jobs), joblib.cpu_count(), len(missing)))
+            with span('price.train_models.fit'):
+                results = joblib.Parallel(n_jobs=n_jobs)(
+                    joblib.delayed(train_crop_model_timed)(self.training_data[crop]) for crop in missing
+                )
+            for crop, (bundle, _) in zip(missing, results):
+                self.models.add_trained(crop, bundle)
+            self._record_training({crop: seconds for crop, (_, seconds) in zip(missing, results)},
+                                  n_jobs=n_jobs, wall_seconds=time.perf_counter() - start)
+        return {
+            'loaded': [c for c in crops if c not in missing],
+            'trained': missing,
+            'wall_seconds': time.perf_counter() - start
+        }
+
+    def _record_training(self, seconds: Dict[str, float], n_jobs: int, wall_seconds: Optional[float] = None):
+        """Merge per-crop fit times into the training manifest next to the artifacts."""
+        with self._manifest_lock:
+            manifest = self.registry.load_json(TRAINING_MANIFEST) or {'crops': {}}
+            for crop, elapsed in seconds.items():
+                manifest['crops'][crop] = {
+                    'key': self.models.keys[crop],
+                    'rows': int(len(self.training_data[crop])),
+                    'seconds': round(elapsed, 4),
+                    'trained_at': datetime.now().isoformat(timespec='seconds')
+                }
+            # Drop crops whose artifacts were retrained under a different key or removed
+            manifest['crops'] = {
+                crop: entry for crop, entry in manifest['crops'].items()
+                if self.models.keys.get(crop) == entry.get('key')
+            }
+            manifest['last_run'] = {
+                'crops_trained': sorted(seconds),
+                'n_jobs': n_jobs,
+                'fit_seconds_total': round(sum(seconds.values()), 4),
+                'wall_seconds': round(wall_seconds if wall_seconds is not None else sum(seconds.values()), 4)
             }
-        
-        # Save models
-        if not os.path.exists('models'):
-            os.makedirs('models')
-        joblib.dump(self.models, 'models/price_prediction_models.joblib')
+            self.training_manifest = manifest
+            try:
+                self.registry.save_json(TRAINING_MANIFEST, manifest)
+            except OSError:
+                pass
 
-    def predict_price(self, crop, days_ahead=30):
+    @timed('price.predict_price')
+    def predict_price(self, crop, days_ahead=30, response_format='rows'):
         """
         Predict prices for the next specified number of days
+        Results are memoized per (crop, days_ahead, format) for the current calendar day.
         """
+        return self.cache.get_or_compute(
+            (str(crop).lower(), days_ahead, response_format),
+            lambda: self._predict_price(crop, days_ahead, response_format),
+            cacheable=lambda result: result.get('success', False)
+        )
+
+    def _predict_price(self, crop, days_ahead, response_format='rows'):
         try:
             if crop.lower() not in self.models:
                 return {
@@ -92,43 +423,178 @@ class PricePredictionSystem:
                     'error': f'No model available for crop: {crop}'
                 }
 
-            model_data = self.models[crop.lower()]
+            with span('price.model_load'):
+                model_data = self.models[crop.lower()]
             model = model_data['model']
             scaler = model_data['scaler']
 
-            # Generate dates for prediction
-            dates = pd.date_range(start=datetime.now(), periods=days_ahead, freq='D')
-            
-            # Prepare features for prediction
-            prediction_data = pd.DataFrame({
-                'month': dates.month,
-                'day_of_week': dates.dayofweek,
-                'season': (dates.month % 12 + 3) // 3
-            })
+            # Generate dates and features for prediction
+            with span('price.features'):
+                dates, prediction_data = calendar_features(days_ahead)
             
             # Scale features
-            X_pred = scaler.transform(prediction_data)
+            with span('price.scale'):
+                X_pred = scaler.transform(prediction_data)
             
             # Make predictions
-            predictions = model.predict(X_pred)
-            
-            # Calculate confidence intervals (simplified)
-            std_dev = np.std(predictions)
-            confidence_interval = 1.96 * std_dev  # 95% confidence interval
+            with span('price.inference'):
+                predictions = model.predict(X_pred)
             
+            with span('price.format'):
+                return price_response(dates, predictions, validate_format(response_format),
+                                      interval_half_widths(model_data, prediction_data['month'].to_numpy()))
+        except Exception as e:
             return {
-                'success': True,
-                'predictions': [
-                    {
-                        'date': date.strftime('%Y-%m-%d'),
-                        'price': float(price),
-                        'lower_bound': float(max(0, price - confidence_interval)),
-                        'upper_bound': float(price + confidence_interval)
+                'success': False,
+                'error': str(e)
+            }
+
+    @timed('price.predict_price_many')
+    def predict_price_many(self, requests: List[tuple]) -> List[Dict]:
+        """
+        Answer many (crop, days_ahead[, format]) requests at once, in input order.
+        Calendar features are built once for the longest horizon and each crop model scores
+        them in one call; shorter horizons are prefixes of the same forecast, so every result
+        matches predict_price for that request. Cached answers are reused and new ones stored.
+        """
+        results: List[Optional[Dict]] = [None] * len(requests)
+        pending: Dict[str, List[int]] = {}
+        requests = [(crop, days_ahead, *rest) if rest else (crop, days_ahead, 'rows')
+                    for crop, days_ahead, *rest in requests]
+        for i, (crop, days_ahead, response_format) in enumerate(requests):
+            key = (str(crop).lower(), days_ahead, response_format)
+            cached = self.cache.get(key) if self.cache.enabled else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key[0], []).append(i)
+        if not pending:
+            return results
+
+        with span('price.features'):
+            dates, features = calendar_features(max(requests[i][1] for idx in pending.values() for i in idx))
+        for crop, indices in pending.items():
+            if crop not in self.models:
+                for i in indices:
+                    # Echo each caller's own spelling, as predict_price does
+                    results[i] = {
+                        'success': False,
+                        'error': f'No model available for crop: {requests[i][0]}'
+                    }
+                continue
+            try:
+                with span('price.model_load'):
+                    model_data = self.models[crop]
+                horizon = max(requests[i][1] for i in indices)
+                with span('price.scale'):
+                    X_pred = model_data['scaler'].transform(features.iloc[:horizon])
+                with span('price.inference'):
+                    predictions = model_data['model'].predict(X_pred)
+                with span('price.format'):
+                    half_widths = interval_half_widths(model_data, features['month'].to_numpy()[:horizon])
+                    for i in indices:
+                        _, days_ahead, response_format = requests[i]
+                        results[i] = price_response(dates[:days_ahead], predictions[:days_ahead],
+                                                    validate_format(response_format),
+                                                    None if half_widths is None else half_widths[:days_ahead])
+                        self.cache.put((crop, days_ahead, response_format), results[i])
+            except Exception as e:
+                for i in indices:
+                    results[i] = {
+                        'success': False,
+                        'error': str(e)
+                    }
+        return results
+
+    def ingest(self, crop: str, observations, extra_estimators: int = 20,
+               window_days: int = 730, max_estimators: int = 300) -> Dict:
+        """
+        Append new daily prices for one crop and update only that crop's model.
+        The observations are persisted to the history store, the crop model is warm-started
+        (or refit on a recent window, see update_crop_model) off to the side, saved, and then
+        swapped in atomically; other crops and in-flight predictions are unaffected.
+        """
+        try:
+            crop = crop.lower()
+            new = parse_price_observations(observations)
+            if new.empty:
+                return {
+                    'success': False,
+                    'error': 'No valid observations'
+                }
+            self.history.append(crop, new)
+
+            with self._update_lock:
+                crop_data = merge_observations(crop, self.training_data.get(crop), new)
+                self.training_data[crop] = crop_data
+                if len(crop_data) < MIN_TRAINING_ROWS:
+                    return {
+                        'success': True,
+                        'crop': crop,
+                        'observations': int(len(new)),
+                        'model_updated': False,
+                        'message': f'Need {MIN_TRAINING_ROWS} days of prices before training'
                     }
-                    for date, price in zip(dates, predictions)
-                ],
-                'average_price': float(np.mean(predictions)),
-                'confidence_interval': float(confidence_interval)
+
+                current = self.models[crop] if crop in self.models else None
+                bundle, mode = update_crop_model(current, crop_data, extra_estimators, window_days, max_estimators)
+                key = crop_model_key(crop, crop_data)
+                self.registry.save(self.models.artifact_name(crop), key, bundle)
+                self.models.replace(crop, key, bundle)
+            self.cache.invalidate()
+
+            return {
+                'success': True,
+                'crop': crop,
+                'observations': int(len(new)),
+                'model_updated': True,
+                'update': mode,
+                'n_estimators': int(bundle['model'].n_estimators)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def forecast_bulk(self, crops: Optional[List[str]] = None, horizons: Optional[List[int]] = None):
+        """
+        Forecast several crops over several horizons in one call.
+        Every horizon is a prefix of the longest one, so the calendar features are
+        built once and shared by all models. The result is columnar: one dates array
+        and a crops x days price matrix, plus per-horizon average prices.
+        """
+        try:
+            crops = [c.lower() for c in (crops or list(self.models))]
+            unknown = [c for c in crops if c not in self.models]
+            if unknown:
+                return {
+                    'success': False,
+                    'error': f'No model available for crop: {", ".join(unknown)}'
+                }
+            horizons = sorted({int(h) for h in (horizons or [7, 30, 90])})
+            if not horizons or horizons[0] < 1 or horizons[-1] > 365:
+                return {
+                    'success': False,
+                    'error': 'Horizons must be between 1 and 365'
+                }
+
+            dates, features = calendar_features(horizons[-1])
+            prices = np.empty((len(crops), len(dates)))
+            for i, crop in enumerate(crops):
+                model_data = self.models[crop]
+                prices[i] = model_data['model'].predict(model_data['scaler'].transform(features))
+
+            return {
+                'success': True,
+                'crops': crops,
+                'horizons': horizons,
+                'dates': format_dates(dates),
+                'prices': prices.tolist(),
+                'average_price': {
+                    str(h): prices[:, :h].mean(axis=1).tolist()
+                    for h in horizons
+                }
             }
         except Exception as e:
             return {
@@ -140,99 +606,197 @@ class PricePredictionSystem:
         """
         Get factors affecting price for a specific crop
         """
-        # This could be expanded with real data and analysis
-        factors = {
-            'rice': [
-                {'factor': 'Seasonal demand', 'impact': 'High'},
-                {'factor': 'Monsoon conditions', 'impact': 'High'},
-                {'factor': 'Global supply', 'impact': 'Medium'},
-                {'factor': 'Government policies', 'impact': 'High'}
-            ],
-            'wheat': [
-                {'factor': 'Winter crop yield', 'impact': 'High'},
-                {'factor': 'International prices', 'impact': 'Medium'},
-                {'factor': 'Storage conditions', 'impact': 'Medium'}
-            ]
-            # Add more crops
+        return get_price_factors(crop)
+
+def get_price_factors(crop):
+    """
+    Get factors affecting price for a specific crop (static lookup, no model needed)
+    """
+    # This could be expanded with real data and analysis
+    return PRICE_FACTORS.get(crop.lower(), [])
+
+def quick_health(registry: Optional[ModelRegistry] = None) -> Dict:
+    """
+    Health check that avoids importing the ML stack or training:
+    verifies dependencies are installed and reports whether a trained artifact is on disk.
+    """
+    missing = missing_modules(REQUIRED_MODULES)
+    if missing:
+        return {
+            'success': False,
+            'status': 'unhealthy',
+            'error': f'Missing dependencies: {", ".join(missing)}'
         }
-        
-        return factors.get(crop.lower(), [])
+    registry = registry or ModelRegistry()
+    return {
+        'success': True,
+        'status': 'healthy',
+        'message': 'Dependencies available; models load on first prediction',
+        'model_cached': os.path.isdir(registry.path(PRICE_MODELS_DIR))
+    }
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({
+def run_command(args: List[str], predictor: Optional['PricePredictionSystem'] = None) -> Dict:
+    """
+    Execute one CLI command and return its JSON-serializable response.
+    args mirrors sys.argv[1:]; pass a predictor to reuse an already trained system.
+    """
+    if len(args) < 1:
+        return {
             'success': False,
             'error': 'No command provided'
-        }))
-        return
+        }
+
+    command = args[0]
 
-    command = sys.argv[1]
-    
     try:
-        predictor = PricePredictionSystem()
-        
+        # Static lookups and health never need a trained model
+        if command == 'factors':
+            if len(args) < 2:
+                return {
+                    'success': False,
+                    'error': 'Missing crop name'
+                }
+            return {
+                'success': True,
+                'factors': get_price_factors(args[1])
+            }
+
+        if command == 'health' and predictor is None:
+            return quick_health()
+
+        if command == 'metrics':
+            return metrics_response()
+
+        if command == 'manifest':
+            # Per-crop training times from the last runs; never trains anything
+            manifest = (predictor.registry if predictor is not None else ModelRegistry()).load_json(TRAINING_MANIFEST)
+            if manifest is None:
+                return {
+                    'success': False,
+                    'error': 'No training manifest yet'
+                }
+            return {
+                'success': True,
+                'manifest': manifest
+            }
+
+        if command not in MODEL_COMMANDS:
+            return {
+                'success': False,
+                'error': f'Unknown command: {command}'
+            }
+
+        if predictor is None:
+            predictor = PricePredictionSystem()
+
         if command == 'health':
             # Health check - verify models are loaded
             if predictor.models:
-                print(json.dumps({
+                return {
                     'success': True,
                     'status': 'healthy',
                     'message': 'Models are loaded and ready'
-                }))
-            else:
-                print(json.dumps({
-                    'success': False,
-                    'status': 'unhealthy',
-                    'error': 'Models failed to load'
-                }))
-                
+                }
+            return {
+                'success': False,
+                'status': 'unhealthy',
+                'error': 'Models failed to load'
+            }
+
         elif command == 'predict':
-            if len(sys.argv) < 4:
-                print(json.dumps({
+            if len(args) < 3:
+                return {
                     'success': False,
                     'error': 'Missing crop name or days'
-                }))
-                return
-                
-            crop = sys.argv[2]
-            days = sys.argv[3]
-            
-            if not validate_input(crop, days):
-                print(json.dumps({
+                }
+
+            crop = args[1]
+            days = args[2]
+            # Optional 4th argument: 'rows' (default) or 'columns'
+            response_format = args[3] if len(args) > 3 else 'rows'
+
+            if not validate_input(crop, days) or response_format not in RESPONSE_FORMATS:
+                return {
                     'success': False,
                     'error': 'Invalid input parameters'
-                }))
-                return
-            
-            result = predictor.predict_price(crop, int(days))
-            print(json.dumps(result))
-            
-        elif command == 'factors':
-            if len(sys.argv) < 3:
-                print(json.dumps({
+                }
+
+            return predictor.predict_price(crop, int(days), response_format)
+
+        elif command in ('ingest', 'ingest-many'):
+            # ingest <crop> <json observations> | ingest-many <json {crop: observations}>
+            if len(args) < (3 if command == 'ingest' else 2):
+                return {
                     'success': False,
-                    'error': 'Missing crop name'
-                }))
-                return
-                
-            crop = sys.argv[2]
-            factors = predictor.get_price_factors(crop)
-            print(json.dumps({
+                    'error': 'Missing crop or observations'
+                }
+            try:
+                raw = args[2] if command == 'ingest' else args[1]
+                payload = json.loads(raw) if isinstance(raw, str) else raw
+            except json.JSONDecodeError:
+                return {
+                    'success': False,
+                    'error': 'Invalid JSON data'
+                }
+            if command == 'ingest':
+                return predictor.ingest(args[1], payload)
+            if not isinstance(payload, dict):
+                return {
+                    'success': False,
+                    'error': 'ingest-many expects an object of crop -> observations'
+                }
+            results = {crop: predictor.ingest(crop, obs) for crop, obs in payload.items()}
+            return {
+                'success': all(r['success'] for r in results.values()),
+                'results': results
+            }
+
+        elif command == 'cache-stats':
+            return {
                 'success': True,
-                'factors': factors
-            }))
-            
-        else:
-            print(json.dumps({
-                'success': False,
-                'error': f'Unknown command: {command}'
-            }))
-            
+                'cache': predictor.cache.stats()
+            }
+
+        elif command == 'train':
+            # train [n_jobs] [crops e.g. rice,wheat]: load or fit every crop model now
+            try:
+                n_jobs = int(args[1]) if len(args) > 1 and args[1] else None
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'Invalid n_jobs'
+                }
+            crops = [c.strip().lower() for c in str(args[2]).split(',') if c.strip()] if len(args) > 2 else None
+            return {
+                'success': True,
+                **predictor.train_models(crops, n_jobs)
+            }
+
+        elif command == 'forecast-bulk':
+            # forecast-bulk [horizons e.g. 7,30,90] [crops e.g. rice,wheat]
+            try:
+                horizons = [int(h) for h in str(args[1]).split(',')] if len(args) > 1 and args[1] else [7, 30, 90]
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'Invalid horizons'
+                }
+            crops = [c.strip() for c in str(args[2]).split(',') if c.strip()] if len(args) > 2 else None
+            return predictor.forecast_bulk(crops, horizons)
+
+        return {
+            'success': False,
+            'error': f'Unknown command: {command}'
+        }
+
     except Exception as e:
-        print(json.dumps({
+        return {
             'success': False,
             'error': str(e)
-        }))
+        }
+
+def main():
+    print(cli_response(run_command, sys.argv[1:]))
 
 if __name__ == '__main__':
     main()
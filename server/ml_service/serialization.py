@@ -0,0 +1,73 @@
+"""
+Response formatting and JSON encoding for forecast results.
+
+Forecasts are produced as NumPy columns (dates, values). This module turns
+them into responses in one of two layouts:
+
+    rows     [{"date": "2025-01-01", "price": 41.2, ...}, ...]   (default, unchanged)
+    columns  {"date": [...], "price": [...], ...}                 (format='columns')
+
+Dates are formatted for the whole column at once with np.datetime_as_string
+and values are converted with ndarray.tolist(), so no per-day strftime or
+float() calls remain. Row output is byte-identical to the previous per-row
+code and is always encoded with the standard json module.
+
+Columnar responses carry "format": "columns" and are encoded with orjson when
+it is installed (pip install orjson), unless ML_FAST_JSON=0.
+"""
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+RESPONSE_FORMATS = ('rows', 'columns')
+
+try:
+    import orjson
+except ImportError:  # optional speed-up only
+    orjson = None
+
+FAST_JSON = orjson is not None and os.environ.get('ML_FAST_JSON', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def validate_format(response_format: str) -> str:
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    return response_format
+
+
+def format_dates(dates) -> List[str]:
+    """
+    'YYYY-MM-DD' strings for a DatetimeIndex/array of datetimes, in one vectorized call.
+    Timezone-aware dates keep their local calendar day (like strftime), not the UTC one.
+    """
+    if getattr(dates, 'tz', None) is not None:
+        dates = dates.tz_localize(None)
+    elif getattr(getattr(dates, 'dt', None), 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return np.datetime_as_string(np.asarray(dates, dtype='datetime64[D]'), unit='D').tolist()
+
+
+def to_layout(columns: Dict[str, Sequence[Any]], response_format: str = 'rows'):
+    """
+    Lay out equal-length columns (already Python lists) as a list of row dicts
+    or return them unchanged as a dict of columns. Row keys follow column order.
+    """
+    if response_format == 'columns':
+        return columns
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def dumps(obj: Any) -> str:
+    """Encode a response; columnar payloads use the fast encoder when available."""
+    if FAST_JSON and isinstance(obj, dict) and obj.get('format') == 'columns':
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+        except TypeError:
+            # e.g. non-string dict keys, which the json module coerces
+            pass
+    return json.dumps(obj)
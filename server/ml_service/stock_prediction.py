@@ -1,60 +1,178 @@
+from __future__ import annotations
+
+import os
 import sys
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import IO, List, Dict, Any, Optional, Union
+
+from forecast_cache import ForecastCache, payload_key
+from history_store import SalesHistoryStore
+from lazy_imports import LazyModule
+from serialization import RESPONSE_FORMATS, dumps, format_dates, to_layout
+from telemetry import cli_response, metrics_response, span, timed
+
+# Heavy libraries load on first use so health answers without importing them
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
 
-import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+# Identical payloads on the same day yield identical forecasts
+forecast_cache = ForecastCache()
+# Sales stored server side, so payloads can name a history_id instead of shipping sales_history
+sales_store = SalesHistoryStore()
+
+
+def _local_timestamp(value: Any) -> pd.Timestamp:
+    """One date value at its own wall-clock time (any UTC offset dropped); NaT if unparseable."""
+    try:
+        ts = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return pd.NaT
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
 
 
-def parse_sales_history(sales_history: List[Dict[str, Any]]) -> pd.DataFrame:
-    """Parse sales history records [{date: 'YYYY-MM-DD', sold: number}] into a DataFrame.
-    Assumes one record per day; aggregates by date if multiple.
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parse a column of date values in bulk; unparseable entries become NaT."""
+    try:
+        parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    except (ValueError, TypeError):
+        # e.g. mixed timezone offsets: parse element-wise, keeping each entry's local calendar day
+        # (converting to UTC would move sales near midnight to a neighbouring day)
+        parsed = pd.to_datetime(values.map(_local_timestamp))
+    retry = parsed.isna() & values.notna()
+    if retry.any() and parsed.dt.tz is None:
+        # Non-ISO strings such as '01/02/2025' get a second, more lenient pass
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return parsed.dt.normalize()
+
+
+def _sales_columns(sales_history: Union[List[Dict[str, Any]], Dict[str, List[Any]]]) -> tuple:
+    """Raw (dates, sold) lists from records or columnar sales history."""
+    if isinstance(sales_history, dict):
+        dates = sales_history.get('dates')
+        sold = sales_history.get('sold')
+        if not isinstance(dates, list) or not isinstance(sold, list) or len(dates) != len(sold):
+            raise ValueError('columnar sales_history needs equal-length dates and sold lists')
+        return dates, sold
+    if isinstance(sales_history, list):
+        records = [rec if isinstance(rec, dict) else {} for rec in sales_history]
+        return [rec.get('date') for rec in records], [rec.get('sold') for rec in records]
+    raise ValueError('sales_history must be a list')
+
+
+@timed('stock.parse_sales_history')
+def parse_sales_history(sales_history: Union[List[Dict[str, Any]], Dict[str, List[Any]]],
+                        default_if_empty: bool = True) -> pd.DataFrame:
+    """Parse sales history into a DataFrame of daily totals sorted by date.
+    Accepts records [{date: 'YYYY-MM-DD', sold: number}] or columnar input {dates: [...], sold: [...]}.
+    Rows with a missing or unparseable date or sold value are dropped; negative sales count as 0.
+    Aggregates by date if there are multiple records per day.
+    With default_if_empty=False an input without valid rows gives an empty frame.
     """
-    if not isinstance(sales_history, list):
-        raise ValueError('sales_history must be a list')
-    rows = []
-    for rec in sales_history:
-        if not isinstance(rec, dict):
-            continue
-        date = rec.get('date')
-        sold = rec.get('sold')
-        if date is None or sold is None:
-            continue
-        try:
-            d = pd.to_datetime(date).normalize()
-            s = float(sold)
-            if s < 0:
-                s = 0.0
-            rows.append((d, s))
-        except Exception:
-            continue
-    if not rows:
+    dates, sold = _sales_columns(sales_history)
+    df = pd.DataFrame({
+        'date': _parse_dates(pd.Series(dates, dtype=object)),
+        'sold': pd.to_numeric(pd.Series(sold, dtype=object), errors='coerce').astype(float)
+    })
+    df = df[df['date'].notna() & df['sold'].notna()]
+    df['sold'] = df['sold'].clip(lower=0.0)
+
+    if df.empty and default_if_empty:
         # generate a tiny default series (flat 1 unit/day) for robustness
         today = pd.Timestamp(datetime.now().date())
-        rows = [(today - pd.Timedelta(days=i), 1.0) for i in range(14)][::-1]
-    df = pd.DataFrame(rows, columns=['date', 'sold'])
-    df = df.groupby('date', as_index=False)['sold'].sum().sort_values('date')
+        df = pd.DataFrame({'date': pd.date_range(end=today, periods=14, freq='D'), 'sold': 1.0})
+    return df.groupby('date', as_index=False)['sold'].sum().sort_values('date')
+
+
+@timed('stock.parse_sales_histories')
+def parse_sales_histories(histories: List[tuple]) -> tuple:
+    """Parse many products' raw (dates, sold) lists (see _sales_columns) in one pandas pass.
+    Applies parse_sales_history's rules to each product and returns (sold, last_dates): a list of
+    daily-total arrays in date order and a datetime64[D] array of each product's last sales date.
+    """
+    lengths = np.fromiter((len(dates) for dates, _ in histories), dtype=np.int64, count=len(histories))
+    df = pd.DataFrame({
+        'item': np.repeat(np.arange(len(histories)), lengths),
+        'date': _parse_dates(pd.Series([d for dates, _ in histories for d in dates], dtype=object)),
+        'sold': pd.to_numeric(pd.Series([v for _, sold in histories for v in sold], dtype=object),
+                              errors='coerce').astype(float)
+    })
+    df = df[df['date'].notna() & df['sold'].notna()]
+    totals = df.assign(sold=df['sold'].clip(lower=0.0)).groupby(['item', 'date'], sort=True)['sold'].sum()
+
+    counts = np.bincount(totals.index.get_level_values('item'), minlength=len(histories))
+    ends = np.cumsum(counts)
+    dates = totals.index.get_level_values('date')
+    # Local calendar days, as parse_sales_history keeps them; .values of tz-aware dates is UTC
+    days = (dates.tz_localize(None) if dates.tz is not None else dates).values.astype('datetime64[D]')
+    sold = np.split(totals.to_numpy(dtype=float), ends[:-1])
+    last_dates = days[np.maximum(ends - 1, 0)] if len(days) else np.empty(len(histories), dtype='datetime64[D]')
+    empty = np.flatnonzero(counts == 0)
+    if len(empty):
+        # Same default as parse_sales_history: flat 1 unit/day for the 14 days up to today
+        last_dates[empty] = np.datetime64(datetime.now().date(), 'D')
+        for i in empty:
+            sold[i] = np.ones(14)
+    return sold, last_dates
+
+
+def load_sales_history(payload: Dict[str, Any]) -> pd.DataFrame:
+    """Daily sales for a payload: the stored series named by history_id (optionally limited to
+    history_start..history_end), else the inline sales_history parsed by parse_sales_history.
+    """
+    history_id = payload.get('history_id')
+    if history_id is None:
+        return parse_sales_history(payload.get('sales_history', []))
+    with span('stock.read_history'):
+        df = sales_store.read(str(history_id), payload.get('history_start'), payload.get('history_end'))
+    if df.empty:
+        raise LookupError(f'No stored sales history for: {history_id}')
     return df
 
 
-def forecast_sales(df: pd.DataFrame, days_ahead: int) -> List[float]:
+def ingest_sales(history_id: str, sales_history: Union[List[Dict[str, Any]], Dict[str, List[Any]]]) -> Dict[str, Any]:
+    """Store daily sales totals for a product; a day already stored is replaced by the new total."""
+    df = parse_sales_history(sales_history, default_if_empty=False)
+    if df.empty:
+        return {'success': False, 'error': 'No valid sales records'}
+    days = sales_store.append(str(history_id), df)
+    first, n_days = sales_store.extent(str(history_id))
+    return {
+        'success': True,
+        'history_id': str(history_id),
+        'days_written': days,
+        'first_date': str(np.datetime64(first, 'D')),
+        'last_date': str(np.datetime64(first + n_days - 1, 'D'))
+    }
+
+
+TREND_MODELS = ('sklearn', 'closed_form')
+
+
+@timed('stock.forecast_sales')
+def forecast_sales(df: pd.DataFrame, days_ahead: int, trend_model: str = 'sklearn') -> List[float]:
     """Forecast daily sales for next N days with a simple Linear Regression on time index.
     Falls back to last-7-days mean if regression is degenerate.
+    trend_model='closed_form' solves the same least-squares line directly with NumPy
+    (see trend_forecast_batch) instead of fitting sklearn's LinearRegression.
     """
-    # Create numeric time index
-    df = df.copy()
-    df['t'] = np.arange(len(df))
-    X = df[['t']].values
-    y = df['sold'].values
+    y = df['sold'].to_numpy(dtype=float)
+    if trend_model == 'closed_form':
+        return trend_forecast_batch([y], days_ahead)[0].tolist()
+    if trend_model != 'sklearn':
+        raise ValueError(f'Unknown trend_model: {trend_model}')
+
+    from sklearn.linear_model import LinearRegression
 
     preds = None
     try:
-        if len(df) >= 3 and np.any(y > 0):
+        if len(y) >= 3 and np.any(y > 0):
+            # Numeric time index as the single feature
+            X = np.arange(len(y)).reshape(-1, 1)
             model = LinearRegression()
             model.fit(X, y)
-            t_future = np.arange(len(df), len(df) + days_ahead).reshape(-1, 1)
+            t_future = np.arange(len(y), len(y) + days_ahead).reshape(-1, 1)
             pred = model.predict(t_future)
             # Clip to non-negative
             preds = np.clip(pred, 0.0, None).tolist()
@@ -63,74 +181,459 @@ def forecast_sales(df: pd.DataFrame, days_ahead: int) -> List[float]:
 
     if preds is None:
         # Fallback: moving average of last up to 7 days
-        window = min(7, len(df))
-        mean_val = float(np.maximum(0.0, df['sold'].tail(window).mean())) if window > 0 else 0.0
+        window = min(7, len(y))
+        mean_val = float(np.maximum(0.0, y[-window:].mean())) if window > 0 else 0.0
         preds = [mean_val for _ in range(days_ahead)]
 
     return preds
 
 
+@timed('stock.predict_stock')
 def predict_stock(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Forecast sales and stock depletion for one product payload (memoized per payload and day)."""
+    key = payload_key(payload)
+    if isinstance(payload, dict) and payload.get('history_id') is not None:
+        # A stored history can change under an identical payload
+        key = payload_key([key, sales_store.version(str(payload['history_id']))])
+    return forecast_cache.get_or_compute(
+        key,
+        lambda: _predict_stock(payload),
+        cacheable=lambda result: result.get('success', False)
+    )
+
+
+def _predict_stock(payload: Dict[str, Any]) -> Dict[str, Any]:
     product = payload.get('product_name') or 'Product'
     current_stock = float(payload.get('current_stock', 0))
     days_ahead = int(payload.get('days_ahead', 30))
-    sales_history = payload.get('sales_history', [])
+    trend_model = payload.get('trend_model') or 'sklearn'
+    response_format = payload.get('format') or 'rows'
 
     if days_ahead < 1 or days_ahead > 365:
         return {'success': False, 'error': 'days_ahead must be between 1 and 365'}
+    if trend_model not in TREND_MODELS:
+        return {'success': False, 'error': f"trend_model must be one of: {', '.join(TREND_MODELS)}"}
+    if response_format not in RESPONSE_FORMATS:
+        return {'success': False, 'error': f"format must be one of: {', '.join(RESPONSE_FORMATS)}"}
+
+    df = load_sales_history(payload)
+    preds = forecast_sales(df, days_ahead, trend_model)
+    with span('stock.build_result'):
+        return build_stock_result(product, current_stock, days_ahead, df, preds, response_format)
 
-    df = parse_sales_history(sales_history)
-    preds = forecast_sales(df, days_ahead)
 
-    # Compute projected stock over horizon
-    projected = []
+def project_stock(current_stock: float, sold: np.ndarray) -> np.ndarray:
+    """Stock left after each forecast day, floored at zero: s[i] = max(0, s[i-1] - sold[i])."""
+    if np.all(sold >= 0):
+        # With non-negative sales the floor is absorbing, so a running subtraction plus a final
+        # clamp gives exactly the same floats as the day-by-day update
+        remaining = np.subtract.accumulate(np.concatenate(([current_stock], sold)))[1:]
+        return np.where(remaining > 0.0, remaining, 0.0)
     stock = current_stock
-    stockout_date = None
-    start_date = (df['date'].max() if not df.empty else pd.Timestamp(datetime.now().date())) + pd.Timedelta(days=1)
+    remaining = np.empty(len(sold))
+    for i, daily_sold in enumerate(sold):
+        stock = max(0.0, stock - daily_sold)
+        remaining[i] = stock
+    return remaining
+
 
-    for i, daily_sold in enumerate(preds):
-        date_i = (start_date + pd.Timedelta(days=i)).date().isoformat()
-        stock = float(max(0.0, stock - daily_sold))
-        projected.append({'date': date_i, 'predicted_sold': float(daily_sold), 'projected_stock': stock})
-        if stockout_date is None and stock <= 0.0:
-            stockout_date = date_i
+def build_stock_result(product: str, current_stock: float, days_ahead: int,
+                       df: pd.DataFrame, preds: List[float], response_format: str = 'rows') -> Dict[str, Any]:
+    """Project stock over the forecast horizon and assemble the predict_stock response.
+    response_format 'rows' gives one dict per day in 'projected'; 'columns' gives one list per field.
+    """
+    sold = np.asarray(preds, dtype=float)
+    start_date = (df['date'].max() if not df.empty else pd.Timestamp(datetime.now().date())) + pd.Timedelta(days=1)
+    dates = format_dates(pd.date_range(start_date, periods=len(sold), freq='D'))
+    remaining = project_stock(float(current_stock), sold)
+    out = np.flatnonzero(remaining <= 0.0)
 
     summary = {
         'success': True,
         'product': product,
         'current_stock': current_stock,
         'days_ahead': days_ahead,
-        'projected': projected,
-        'stockout_date': stockout_date,
-        'average_daily_sales_forecast': float(np.mean(preds)) if preds else 0.0
+        'projected': to_layout({
+            'date': dates,
+            'predicted_sold': sold.tolist(),
+            'projected_stock': remaining.tolist()
+        }, response_format),
+        'stockout_date': dates[out[0]] if len(out) else None,
+        'average_daily_sales_forecast': float(np.mean(preds)) if len(preds) else 0.0
     }
+    if response_format == 'columns':
+        summary['format'] = 'columns'
     return summary
 
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({'success': False, 'error': 'No command provided'}))
-        return
-    command = sys.argv[1]
+def trend_forecast_batch(series: Union[List[np.ndarray], np.ndarray], days_ahead: int,
+                         lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """Closed-form least-squares trend forecasts for many series at once.
+    series is either a list of ragged 1-D arrays or a left-aligned padded 2-D array with
+    per-row `lengths` (default: full width). Slope and intercept come from the two-parameter
+    normal equations computed row-wise over a validity mask. Matches forecast_sales:
+    series shorter than 3 points or with no positive sales fall back to the last-7-days mean.
+    Returns an (n_series, days_ahead) array of non-negative daily forecasts.
+    """
+    if isinstance(series, np.ndarray) and series.ndim == 2:
+        n, width = series.shape
+        lengths = np.full(n, width, dtype=np.int64) if lengths is None else np.asarray(lengths, dtype=np.int64)
+        t = np.arange(max(width, 1))
+        mask = t < lengths[:, None]
+        Y = np.where(mask, series.astype(float), 0.0) if width else np.zeros((n, 1))
+    else:
+        n = len(series)
+        if n == 0:
+            return np.zeros((0, days_ahead))
+        lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=n)
+        width = max(int(lengths.max()), 1)
+        t = np.arange(width)
+        mask = t < lengths[:, None]
+        Y = np.zeros((n, width))
+        Y[mask] = np.concatenate([np.asarray(s, dtype=float) for s in series])
+
+    counts = np.maximum(lengths, 1).astype(float)
+    t_mean = (lengths - 1) / 2.0
+    y_mean = Y.sum(axis=1) / counts
+    dt = np.where(mask, t - t_mean[:, None], 0.0)
+    sxx = (dt * dt).sum(axis=1)
+    sxy = (dt * Y).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros(n), where=sxx > 0)
+    intercept = y_mean - slope * t_mean
+
+    t_future = lengths[:, None] + np.arange(days_ahead)
+    preds = np.clip(intercept[:, None] + slope[:, None] * t_future, 0.0, None)
+
+    # Fallback: moving average of last up to 7 days
+    degenerate = (lengths < 3) | ~((Y > 0) & mask).any(axis=1)
+    if degenerate.any():
+        last_window = mask & (t >= (lengths - 7)[:, None])
+        window_sizes = last_window.sum(axis=1)
+        window_mean = np.divide((Y * last_window).sum(axis=1), window_sizes,
+                                out=np.zeros(n), where=window_sizes > 0)
+        preds[degenerate] = np.maximum(0.0, window_mean[degenerate])[:, None]
+    return preds
+
+
+def _predict_small_batch(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Forecast many short-history products with one vectorized trend fit instead of one sklearn fit each."""
+    results: List[Dict[str, Any]] = [None] * len(payloads)
+    parsed = []
+    for i, payload in enumerate(payloads):
+        try:
+            product = payload.get('product_name') or 'Product'
+            current_stock = float(payload.get('current_stock', 0))
+            days_ahead = int(payload.get('days_ahead', 30))
+            trend_model = payload.get('trend_model') or 'sklearn'
+            response_format = payload.get('format') or 'rows'
+            if days_ahead < 1 or days_ahead > 365:
+                results[i] = {'success': False, 'error': 'days_ahead must be between 1 and 365'}
+                continue
+            if trend_model not in TREND_MODELS:
+                results[i] = {'success': False, 'error': f"trend_model must be one of: {', '.join(TREND_MODELS)}"}
+                continue
+            if response_format not in RESPONSE_FORMATS:
+                results[i] = {'success': False, 'error': f"format must be one of: {', '.join(RESPONSE_FORMATS)}"}
+                continue
+            df = load_sales_history(payload)
+            parsed.append((i, product, current_stock, days_ahead, df, response_format))
+        except Exception as e:
+            results[i] = {'success': False, 'error': str(e)}
+
+    if parsed:
+        horizon = max(p[3] for p in parsed)
+        preds = trend_forecast_batch([p[4]['sold'].to_numpy() for p in parsed], horizon)
+        for row, (i, product, current_stock, days_ahead, df, response_format) in enumerate(parsed):
+            results[i] = build_stock_result(product, current_stock, days_ahead, df,
+                                            preds[row, :days_ahead], response_format)
+    return results
+
+
+def _safe_predict_stock(payload: Any) -> Dict[str, Any]:
+    if not isinstance(payload, dict):
+        return {'success': False, 'error': 'payload must be a JSON object'}
+    try:
+        return _predict_stock(payload)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def _history_length(payload: Any) -> int:
+    if isinstance(payload, dict) and payload.get('history_id') is not None:
+        extent = sales_store.extent(str(payload['history_id']))
+        return extent[1] if extent else 0
+    history = payload.get('sales_history', []) if isinstance(payload, dict) else []
+    if isinstance(history, dict):
+        history = history.get('sold') or []
+    return len(history) if isinstance(history, list) else 0
+
+
+def predict_stock_many(payloads: List[Dict[str, Any]], workers: Optional[int] = None,
+                       chunksize: Optional[int] = None, small_series_max: int = 30) -> List[Dict[str, Any]]:
+    """Forecast many products, returning results in input order.
+    Products asking for trend_model='closed_form' with at most small_series_max history records are solved
+    together in this process; the rest (including the default sklearn model) are sharded across a
+    ProcessPoolExecutor with `workers` processes (default: CPU count, 1 runs inline) in chunks of `chunksize`
+    payloads.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    results: List[Dict[str, Any]] = [None] * len(payloads)
+    small = [i for i, p in enumerate(payloads)
+             if isinstance(p, dict) and p.get('trend_model') == 'closed_form' and _history_length(p) <= small_series_max]
+    small_set = set(small)
+    large = [i for i in range(len(payloads)) if i not in small_set]
+
+    for i, result in zip(small, _predict_small_batch([payloads[i] for i in small])):
+        results[i] = result
+
+    if large:
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(large))
+        if workers <= 1:
+            large_results = [_safe_predict_stock(payloads[i]) for i in large]
+        else:
+            chunksize = chunksize or max(1, len(large) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                large_results = list(pool.map(_safe_predict_stock, [payloads[i] for i in large], chunksize=chunksize))
+        for i, result in zip(large, large_results):
+            results[i] = result
+    return results
+
+
+def searchsorted_rows(sorted_rows: np.ndarray, targets: np.ndarray, side: str = 'left') -> np.ndarray:
+    """np.searchsorted applied to every ascending row of a 2-D array with its own target.
+    Counted with one row-wise comparison, so each row's answer is exact and independent of the
+    other rows in the batch; the cost is O(n * width), the same as building the rows with cumsum.
+    """
+    if side == 'left':
+        return np.count_nonzero(sorted_rows < targets[:, None], axis=1)
+    return np.count_nonzero(sorted_rows <= targets[:, None], axis=1)
+
+
+def plan_restock_batch(current_stock: np.ndarray, demand: np.ndarray, lead_time: np.ndarray,
+                       safety_stock: np.ndarray, cover_days: np.ndarray) -> Dict[str, np.ndarray]:
+    """Restock plan for many products from their daily demand forecasts, (n, horizon), in one pass.
+    With cumulative demand C (C[d] = units sold before day d, from np.cumsum):
+      stockout_day    first day whose sales empty the shelf: C[d + 1] >= stock
+      reorder_point   forecast demand over the lead time plus safety stock: C[lead] + safety
+      reorder_day     an order placed then arrives (lead days later) just before stock would first
+                      drop below safety stock; 0 means order now
+      order_quantity  demand for cover_days after arrival plus safety stock, less the stock left on arrival
+    Days are offsets from the first forecast day; stockout_day equals horizon if stock lasts past it.
+    The horizon must reach reorder_day + lead + cover_days for the quantities to be complete.
+    """
+    n, horizon = demand.shape
+    cum = np.concatenate((np.zeros((n, 1)), np.cumsum(demand, axis=1)), axis=1)
+    rows = np.arange(n)
+    stockout_day = searchsorted_rows(cum[:, 1:], current_stock, side='left')
+    below_safety = searchsorted_rows(cum[:, 1:], current_stock - safety_stock, side='right')
+    reorder_day = np.maximum(below_safety - lead_time, 0)
+    arrival = np.minimum(reorder_day + lead_time, horizon)
+    stock_on_arrival = np.maximum(current_stock - cum[rows, arrival], 0.0)
+    cover_demand = cum[rows, np.minimum(arrival + cover_days, horizon)] - cum[rows, arrival]
+    return {
+        'stockout_day': stockout_day,
+        'reorder_point': cum[rows, np.minimum(lead_time, horizon)] + safety_stock,
+        'reorder_day': reorder_day,
+        'order_quantity': np.maximum(cover_demand + safety_stock - stock_on_arrival, 0.0)
+    }
+
+
+RESTOCK_DEFAULTS = {'days_ahead': 30, 'lead_time_days': 7, 'safety_stock': 0.0, 'cover_days': 30}
+
+
+@timed('stock.plan_restock')
+def plan_restock(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reorder points and order suggestions for a whole inventory, results in input order.
+    Each item is a predict payload (sales_history or history_id, current_stock, days_ahead) plus optional
+    lead_time_days, safety_stock (units) and cover_days (days of demand an order should cover).
+    All demand forecasts come from one closed-form trend fit (trend_forecast_batch) and the plan from
+    plan_restock_batch; a reorder falling after the days_ahead planning horizon is reported as not needed.
+    """
+    results: List[Dict[str, Any]] = [None] * len(items)
+    parsed, inline = [], []
+    with span('stock.restock_parse'):
+        for i, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('item must be a JSON object')
+                settings = {name: item.get(name, default) for name, default in RESTOCK_DEFAULTS.items()}
+                days_ahead = int(settings['days_ahead'])
+                lead_time = int(settings['lead_time_days'])
+                cover_days = int(settings['cover_days'])
+                safety_stock = float(settings['safety_stock'])
+                if days_ahead < 1 or days_ahead > 365:
+                    raise ValueError('days_ahead must be between 1 and 365')
+                if lead_time < 0 or lead_time > 365 or cover_days < 1 or cover_days > 365:
+                    raise ValueError('lead_time_days must be 0-365 and cover_days 1-365')
+                if safety_stock < 0:
+                    raise ValueError('safety_stock must not be negative')
+                if item.get('history_id') is None:
+                    history = _sales_columns(item.get('sales_history', []))
+                    inline.append(len(parsed))
+                else:
+                    df = load_sales_history(item)
+                    history = (df['sold'].to_numpy(dtype=float), df['date'].to_numpy().max())
+                parsed.append([i, item.get('product_name') or 'Product', float(item.get('current_stock', 0)),
+                               days_ahead, lead_time, safety_stock, cover_days, history])
+            except Exception as e:
+                results[i] = {'success': False, 'error': str(e)}
+        if inline:
+            # Inline histories are parsed together; stored ones were read as arrays above
+            for row, sold, last_date in zip(inline, *parse_sales_histories([parsed[row][-1] for row in inline])):
+                parsed[row][-1] = (sold, last_date)
+    if not parsed:
+        return results
+
+    i_idx, products, stock, days_ahead, lead_time, safety_stock, cover_days, histories = zip(*parsed)
+    stock, safety_stock = np.array(stock), np.array(safety_stock)
+    days_ahead, lead_time, cover_days = (np.array(v, dtype=np.int64) for v in (days_ahead, lead_time, cover_days))
+    horizon = int(np.max(days_ahead + lead_time + cover_days))
+    with span('stock.restock_forecast'):
+        demand = trend_forecast_batch([sold for sold, _ in histories], horizon)
+    with span('stock.restock_plan'):
+        plan = plan_restock_batch(stock, demand, lead_time, safety_stock, cover_days)
+
+    with span('stock.format'):
+        start = np.array([last_date for _, last_date in histories], dtype='datetime64[D]') + 1
+        stockout = plan['stockout_day'] < days_ahead
+        reorder = plan['reorder_day'] < days_ahead
+        stockout_dates = format_dates(start + np.where(stockout, plan['stockout_day'], 0))
+        reorder_dates = format_dates(start + np.where(reorder, plan['reorder_day'], 0))
+        average = np.cumsum(demand, axis=1)[np.arange(len(demand)), days_ahead - 1] / days_ahead
+        for row, i in enumerate(i_idx):
+            results[i] = {
+                'success': True,
+                'product': products[row],
+                'current_stock': float(stock[row]),
+                'days_ahead': int(days_ahead[row]),
+                'stockout_date': stockout_dates[row] if stockout[row] else None,
+                'days_until_stockout': int(plan['stockout_day'][row]) if stockout[row] else None,
+                'lead_time_days': int(lead_time[row]),
+                'safety_stock': float(safety_stock[row]),
+                'reorder_point': float(plan['reorder_point'][row]),
+                'reorder_needed': bool(reorder[row]),
+                'order_now': bool(reorder[row] and plan['reorder_day'][row] == 0),
+                'reorder_date': reorder_dates[row] if reorder[row] else None,
+                'suggested_order_quantity': float(plan['order_quantity'][row]) if reorder[row] else 0.0,
+                'average_daily_sales_forecast': float(average[row])
+            }
+    return results
+
+
+def predict_stream(source: IO[str], sink: IO[str]) -> Dict[str, int]:
+    """Read newline-delimited product payloads from source and write one result line per product to sink.
+    Each line is handled and written before the next is read, so memory stays flat however many products
+    there are. A payload 'id' is echoed back so callers can match results to listings.
+    """
+    processed = 0
+    failed = 0
+    for line_no, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            payload = None
+        if not isinstance(payload, dict):
+            result = {'success': False, 'error': 'Invalid JSON payload', 'line': line_no}
+        else:
+            try:
+                # Bypass the memo cache: streamed payloads are rarely repeated
+                result = _predict_stock(payload)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            result['line'] = line_no
+            if 'id' in payload:
+                result['id'] = payload['id']
+        processed += 1
+        if not result.get('success'):
+            failed += 1
+        sink.write(dumps(result) + '\n')
+        sink.flush()
+    return {'processed': processed, 'failed': failed}
+
+
+def _json_arg(value: Any) -> Any:
+    """Decode a JSON CLI argument; '-' reads it from stdin (for inputs too large for argv)."""
+    if value == '-':
+        return json.load(sys.stdin)
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def run_command(args: List[Any]) -> Dict[str, Any]:
+    """Execute one CLI command (args mirrors sys.argv[1:]) and return its response dict."""
+    if len(args) < 1:
+        return {'success': False, 'error': 'No command provided'}
+    command = args[0]
     try:
         if command == 'health':
-            print(json.dumps({'success': True, 'status': 'healthy'}))
-            return
+            return {'success': True, 'status': 'healthy'}
+        if command == 'metrics':
+            return metrics_response()
+        if command == 'predict-many':
+            # predict-many <json list of payloads> [workers]
+            if len(args) < 2:
+                return {'success': False, 'error': 'Missing payloads'}
+            try:
+                payloads = json.loads(args[1]) if isinstance(args[1], str) else args[1]
+            except json.JSONDecodeError:
+                return {'success': False, 'error': 'Invalid JSON payload'}
+            if not isinstance(payloads, list):
+                return {'success': False, 'error': 'payloads must be a list'}
+            workers = int(args[2]) if len(args) > 2 else None
+            return {'success': True, 'results': predict_stock_many(payloads, workers=workers)}
+        if command == 'cache-stats':
+            return {'success': True, 'cache': forecast_cache.stats()}
+        if command == 'plan-restock':
+            # plan-restock <json list of items | - to read them from stdin>
+            if len(args) < 2:
+                return {'success': False, 'error': 'Missing items'}
+            try:
+                items = _json_arg(args[1])
+            except json.JSONDecodeError:
+                return {'success': False, 'error': 'Invalid JSON payload'}
+            if not isinstance(items, list):
+                return {'success': False, 'error': 'items must be a list'}
+            return {'success': True, 'results': plan_restock(items)}
+        if command == 'ingest-sales':
+            # ingest-sales <history_id> <json sales_history | - to read it from stdin>
+            if len(args) < 3:
+                return {'success': False, 'error': 'Missing history_id or sales_history'}
+            try:
+                sales_history = _json_arg(args[2])
+            except json.JSONDecodeError:
+                return {'success': False, 'error': 'Invalid JSON payload'}
+            return ingest_sales(args[1], sales_history)
         if command == 'predict':
-            if len(sys.argv) < 3:
-                print(json.dumps({'success': False, 'error': 'Missing payload'}))
-                return
+            if len(args) < 2:
+                return {'success': False, 'error': 'Missing payload'}
             try:
-                payload = json.loads(sys.argv[2])
+                payload = json.loads(args[1]) if isinstance(args[1], str) else args[1]
             except json.JSONDecodeError:
-                print(json.dumps({'success': False, 'error': 'Invalid JSON payload'}))
-                return
-            result = predict_stock(payload)
-            print(json.dumps(result))
-            return
-        print(json.dumps({'success': False, 'error': f'Unknown command: {command}'}))
+                return {'success': False, 'error': 'Invalid JSON payload'}
+            return predict_stock(payload)
+        return {'success': False, 'error': f'Unknown command: {command}'}
     except Exception as e:
-        print(json.dumps({'success': False, 'error': str(e)}))
+        return {'success': False, 'error': str(e)}
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == 'predict-stream':
+        # predict-stream [path|-]: JSON lines in, one result line per product out
+        path = sys.argv[2] if len(sys.argv) > 2 else '-'
+        try:
+            if path == '-':
+                predict_stream(sys.stdin, sys.stdout)
+            else:
+                with open(path) as source:
+                    predict_stream(source, sys.stdout)
+        except OSError as e:
+            print(json.dumps({'success': False, 'error': str(e)}))
+        return
+    print(cli_response(run_command, sys.argv[1:]))
 
 
 if __name__ == '__main__':
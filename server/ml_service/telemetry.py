@@ -0,0 +1,285 @@
+"""
+Stage timing spans and Prometheus-style metrics for the ML service.
+
+Code under measurement wraps each stage in `with span('price.inference'):`.
+A span records its wall time into two optional sinks:
+
+  * the per-request trace opened by `request_timings()`, which callers attach
+    to the response as {"timings": {"span": ms, ...}} when debugging
+    (ML_DEBUG_TIMINGS=1, or "debug": true on a model-server request);
+  * process-wide counters and histograms (ML_METRICS=1), rendered in
+    Prometheus text format by render_prometheus() for the `metrics` command.
+
+Spans nest, so a parent such as price.predict_price includes its children;
+first-use imports show up as import.<module> inside whichever stage triggered them.
+
+With both sinks off, span() returns a shared no-op context manager, so the
+instrumentation costs one function call and a thread-local lookup per stage.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Histogram upper bounds in seconds, from sub-millisecond inference to full training
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _env_flag(name: str, default: str = '0') -> bool:
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            yield repr(bound), running
+        yield '+Inf', self.count
+
+
+class MetricsRegistry:
+    """Thread-safe store of span histograms and labelled request counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: int = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'spans': {
+                    name: {
+                        'count': h.count,
+                        'sum_ms': round(h.sum * 1000, 3),
+                        'mean_ms': round(h.sum / h.count * 1000, 3) if h.count else 0.0
+                    }
+                    for name, h in sorted(self.spans.items())
+                },
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ]
+            }
+
+    def render_prometheus(self, prefix: str = 'ml') -> str:
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f'{prefix}_{name}{_labels(labels)} {value}')
+            if self.spans:
+                metric = f'{prefix}_span_duration_seconds'
+                lines.append(f'# HELP {metric} Wall time of instrumented ML service stages.')
+                lines.append(f'# TYPE {metric} histogram')
+                for name, h in sorted(self.spans.items()):
+                    for bound, count in h.cumulative():
+                        lines.append(f'{metric}_bucket{_labels((("span", name), ("le", bound)))} {count}')
+                    lines.append(f'{metric}_sum{_labels((("span", name),))} {h.sum!r}')
+                    lines.append(f'{metric}_count{_labels((("span", name),))} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+metrics = MetricsRegistry()
+_state = {
+    'metrics': _env_flag('ML_METRICS'),
+    'debug': _env_flag('ML_DEBUG_TIMINGS')
+}
+_local = threading.local()
+
+
+def configure(metrics_enabled: Optional[bool] = None, debug: Optional[bool] = None):
+    """Turn the process-wide metrics sink or default debug timings on or off."""
+    if metrics_enabled is not None:
+        _state['metrics'] = metrics_enabled
+    if debug is not None:
+        _state['debug'] = debug
+
+
+def metrics_enabled() -> bool:
+    return _state['metrics']
+
+
+def debug_enabled() -> bool:
+    return _state['debug']
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'trace', 'start')
+
+    def __init__(self, name: str, trace: Optional[Dict[str, float]]):
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.trace is not None:
+            self.trace[self.name] = self.trace.get(self.name, 0.0) + elapsed * 1000
+        if _state['metrics']:
+            metrics.observe(self.name, elapsed)
+        return False
+
+
+def span(name: str):
+    """Context manager timing one stage; a no-op unless a trace or metrics are active."""
+    trace = getattr(_local, 'trace', None)
+    if trace is None and not _state['metrics']:
+        return _NOOP
+    return _Span(name, trace)
+
+
+def timed(name: str):
+    """Decorator form of span() for whole-function stages."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, amount: int = 1, **labels: str):
+    if _state['metrics']:
+        metrics.inc(name, amount, **labels)
+
+
+class request_timings:
+    """
+    Collect span durations (ms, summed per name) for the current thread:
+        with request_timings(enabled) as timings: ...
+    Yields None when disabled, so nothing is recorded.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = debug_enabled() if enabled is None else enabled
+        self.trace: Optional[Dict[str, float]] = None
+        self._previous = None
+
+    def __enter__(self) -> Optional[Dict[str, float]]:
+        if not self.enabled:
+            return None
+        self._previous = getattr(_local, 'trace', None)
+        self.trace = {}
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            _local.trace = self._previous
+        return False
+
+
+def process_age_ms() -> Optional[float]:
+    """Milliseconds since this process started (Linux only), i.e. interpreter start-up plus imports so far."""
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, (uptime - start_ticks / os.sysconf('SC_CLK_TCK')) * 1000)
+
+
+def dumps(result: Any, timings: Optional[Dict[str, float]] = None) -> str:
+    """
+    JSON-encode a response; with timings, also time the encoding itself and
+    append {"timings": {...}} to the object without re-encoding the payload.
+    """
+    # Imported here: serialization -> lazy_imports -> telemetry would be circular at module level
+    from serialization import dumps as encode
+
+    if timings is None or not isinstance(result, dict):
+        return encode(result)
+    start = time.perf_counter()
+    encoded = encode(result)
+    timings['serialize'] = (time.perf_counter() - start) * 1000
+    rounded = {name: round(ms, 3) for name, ms in timings.items()}
+    suffix = '"timings": ' + json.dumps(rounded) + '}'
+    return encoded[:-1] + (', ' + suffix if len(encoded) > 2 else suffix)
+
+
+def cli_response(run_command, argv) -> str:
+    """Run a script's run_command and encode its response, with timings when debugging is on."""
+    with request_timings() as timings:
+        if timings is not None:
+            age = process_age_ms()
+            if age is not None:
+                # Interpreter start-up and module imports before main() ran
+                timings['process_startup'] = age
+        result = run_command(argv)
+    return dumps(result, timings)
+
+
+def metrics_response() -> Dict[str, Any]:
+    """Payload for the `metrics` command."""
+    return {
+        'success': True,
+        'enabled': metrics_enabled(),
+        'metrics': metrics.snapshot(),
+        'prometheus': metrics.render_prometheus()
+    }
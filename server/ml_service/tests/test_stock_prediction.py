@@ -0,0 +1,65 @@
+"""
+Regression tests for stock_prediction.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import stock_prediction as sp  # noqa: E402
+
+
+class ParseDatesTest(unittest.TestCase):
+    def test_mixed_offsets_keep_local_days(self):
+        # 23:00 -05:00 is already 2025-01-04 in UTC and 00:30 +05:30 is still 2025-01-01
+        history = [
+            {'date': '2025-01-01T12:00:00+05:30', 'sold': 1},
+            {'date': '2025-01-02T00:30:00+05:30', 'sold': 2},
+            {'date': '2025-01-03T23:00:00-05:00', 'sold': 4},
+            {'date': '2025-01-03T01:00:00+05:30', 'sold': 8}
+        ]
+        df = sp.parse_sales_history(history)
+        self.assertEqual(df['date'].dt.strftime('%Y-%m-%d').tolist(), ['2025-01-01', '2025-01-02', '2025-01-03'])
+        self.assertEqual(df['sold'].tolist(), [1.0, 2.0, 12.0])
+
+        sold, last_dates = sp.parse_sales_histories([sp._sales_columns(history)])
+        self.assertEqual(sold[0].tolist(), [1.0, 2.0, 12.0])
+        self.assertEqual(str(last_dates[0]), '2025-01-03')
+
+        result = sp._predict_stock({'current_stock': 100, 'sales_history': history, 'days_ahead': 2})
+        self.assertEqual(result['projected'][0]['date'], '2025-01-04')
+
+
+class PredictStockManyTest(unittest.TestCase):
+    def short_payloads(self, trend_model=None):
+        rng = np.random.default_rng(7)
+        dates = [f'2025-01-{day:02d}' for day in range(1, 11)]
+        payloads = [{'product_name': f'p{i}', 'current_stock': float(rng.integers(5, 80)), 'days_ahead': 20,
+                     'sales_history': {'dates': dates, 'sold': rng.poisson(rng.uniform(1, 6), 10).tolist()}}
+                    for i in range(40)]
+        if trend_model:
+            for payload in payloads:
+                payload['trend_model'] = trend_model
+        return payloads
+
+    def test_short_sklearn_histories_match_predict_stock(self):
+        for trend_model in ('sklearn', None):
+            payloads = self.short_payloads(trend_model)
+            self.assertEqual(sp.predict_stock_many(payloads, workers=1),
+                             [sp.predict_stock(payload) for payload in payloads])
+
+    def test_short_closed_form_histories_match_predict_stock(self):
+        payloads = self.short_payloads('closed_form')
+        for batched, single in zip(sp.predict_stock_many(payloads, workers=1),
+                                   [sp.predict_stock(payload) for payload in payloads]):
+            self.assertEqual(batched['stockout_date'], single['stockout_date'])
+
+
+if __name__ == '__main__':
+    unittest.main()
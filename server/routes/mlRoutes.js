@@ -1,5 +1,6 @@
 import { Router } from 'express';
 import { spawn } from 'child_process';
+import readline from 'readline';
 import path from 'path';
 import { protect } from '../middleware/authMiddleware.js';
 import { fileURLToPath } from 'url';
@@ -18,7 +19,83 @@ const validateSoilData = (data) => {
     });
 };
 
+// Optional persistent model server (set ML_PERSISTENT_SERVER=true).
+// Keeps models loaded in one long-lived Python process instead of
+// spawning and retraining per request; falls back to one-shot scripts on failure.
+const usePersistentServer = process.env.ML_PERSISTENT_SERVER === 'true';
+let mlServer = null;
+
+const getMlServer = () => {
+    if (mlServer) return mlServer;
+    const exec = process.env.PYTHON_EXEC || process.env.PYTHON_PATH || (process.platform === 'win32' ? 'python' : 'python3');
+    const serverPath = path.join(__dirname, '..', 'ml_service', 'model_server.py');
+    const child = spawn(exec, [serverPath], { cwd: path.join(__dirname, '..', 'ml_service') });
+    const pending = new Map();
+    let nextId = 1;
+
+    const failAll = (err) => {
+        pending.forEach(({ reject, timeout }) => { clearTimeout(timeout); reject(err); });
+        pending.clear();
+        mlServer = null;
+    };
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+        let msg;
+        try { msg = JSON.parse(line); } catch { return; }
+        const entry = pending.get(msg.id);
+        if (!entry) return;
+        pending.delete(msg.id);
+        clearTimeout(entry.timeout);
+        entry.resolve(msg.result);
+    });
+    child.stderr.on('data', (d) => console.error('ML server:', d.toString()));
+    child.on('exit', (code) => failAll(new Error(`ML server exited with code ${code}`)));
+    child.on('error', (err) => failAll(err));
+    child.stdin.on('error', (err) => failAll(err));
+
+    mlServer = {
+        call: (service, args) => new Promise((resolve, reject) => {
+            const id = nextId++;
+            const timeout = setTimeout(() => {
+                pending.delete(id);
+                reject(new Error('ML server request timed out'));
+            }, 30000);
+            pending.set(id, { resolve, reject, timeout });
+            child.stdin.write(JSON.stringify({ id, service, args }) + '\n');
+        })
+    };
+    return mlServer;
+};
+
 const runPythonScript = (scriptName, args = []) => {
+    if (usePersistentServer) {
+        return getMlServer().call(scriptName.replace(/\.py$/, ''), args)
+            .catch((err) => {
+                console.error('ML server unavailable, falling back to script:', err.message);
+                return runPythonScriptOnce(scriptName, args);
+            });
+    }
+    return runPythonScriptOnce(scriptName, args);
+};
+
+// Like runPythonScript, with one large JSON argument. One-shot scripts get '-' in its place and
+// read it from stdin, since a single argv string is capped at 128 KiB on Linux (E2BIG).
+const runPythonScriptWithInput = (scriptName, args, input) => {
+    if (usePersistentServer) {
+        return getMlServer().call(scriptName.replace(/\.py$/, ''), [...args, input])
+            .catch((err) => {
+                console.error('ML server unavailable, falling back to script:', err.message);
+                return runPythonScriptOnce(scriptName, [...args, '-'], input);
+            });
+    }
+    return runPythonScriptOnce(scriptName, [...args, '-'], input);
+};
+
+// Stored sales series belong to the user who wrote them: history ids are namespaced by the
+// caller's account, so one user can neither read nor overwrite another user's series.
+const scopeHistoryId = (user, historyId) => `${user._id}:${historyId}`;
+
+const runPythonScriptOnce = (scriptName, args = [], input = undefined) => {
     const scriptPath = path.join(__dirname, '..', 'ml_service', scriptName);
     const isWin = process.platform === 'win32';
     const candidates = [];
@@ -57,6 +134,10 @@ const runPythonScript = (scriptName, args = []) => {
             }
         });
         pythonProcess.on('error', (err) => { clearTimeout(timeout); reject(err); });
+        if (input !== undefined) {
+            pythonProcess.stdin.on('error', () => {});
+            pythonProcess.stdin.end(JSON.stringify(input));
+        }
     });
 
     return candidates.reduce((p, { exec, preArgs }) => p.catch(() => tryOne(exec, preArgs)), Promise.reject())
@@ -83,6 +164,19 @@ router.get('/health', async (req, res) => {
     }
 });
 
+// Prometheus metrics from the persistent model server (request counters, stage timings)
+router.get('/metrics', async (req, res) => {
+    if (!usePersistentServer) {
+        return res.status(404).json({ error: 'Metrics require ML_PERSISTENT_SERVER=true' });
+    }
+    try {
+        const result = await getMlServer().call(undefined, ['metrics']);
+        res.type('text/plain; version=0.0.4').send(result.prometheus);
+    } catch (error) {
+        res.status(503).json({ error: error.message });
+    }
+});
+
 // Get crop recommendations
 router.post('/crop-recommendation', protect, async (req, res) => {
     try {
@@ -118,6 +212,34 @@ router.post('/crop-recommendation', protect, async (req, res) => {
     }
 });
 
+// What-if sweep: recommendations over a grid of soil/weather values around a base profile
+router.post('/crop-sweep', protect, async (req, res) => {
+    try {
+        const { base, vary, top_k = 3 } = req.body;
+
+        if (!base || !vary || typeof vary !== 'object' || Object.keys(vary).length === 0) {
+            return res.status(400).json({
+                success: false,
+                message: 'A base soil profile and at least one field to vary are required'
+            });
+        }
+
+        const result = await runPythonScript('crop_recommendation.py', [
+            'sweep',
+            { base, vary, top_k }
+        ]);
+
+        res.json(result);
+    } catch (error) {
+        console.error('Crop sweep error:', error);
+        res.status(500).json({
+            success: false,
+            message: 'Error running crop sweep',
+            error: error.message
+        });
+    }
+});
+
 // Get price predictions
 router.post('/price-prediction', protect, async (req, res) => {
     try {
@@ -281,7 +403,10 @@ router.get('/price-factors/:crop', protect, async (req, res) => {
 // New: Predict stock depletion and inventory forecast
 router.post('/stock-prediction', protect, async (req, res) => {
     try {
-        const { product_name, current_stock, days_ahead = 30, sales_history } = req.body || {};
+        const {
+            product_name, current_stock, days_ahead = 30, sales_history, history_id, history_start, history_end,
+            trend_model, format
+        } = req.body || {};
 
         if (product_name === undefined || current_stock === undefined) {
             return res.status(400).json({ 
@@ -294,7 +419,19 @@ router.post('/stock-prediction', protect, async (req, res) => {
             product_name,
             current_stock: Number(current_stock),
             days_ahead: Number.isInteger(days_ahead) ? days_ahead : parseInt(days_ahead, 10) || 30,
-            sales_history: Array.isArray(sales_history) ? sales_history : []
+            // Either [{ date, sold }] records or columnar { dates: [...], sold: [...] }
+            sales_history: Array.isArray(sales_history)
+                || (sales_history && Array.isArray(sales_history.dates) && Array.isArray(sales_history.sold))
+                ? sales_history
+                : [],
+            // Or sales stored server side (see POST /sales-history), optionally limited to a date range
+            ...(history_id !== undefined
+                ? { history_id: scopeHistoryId(req.user, history_id), history_start, history_end }
+                : {}),
+            // Optional A/B switch: 'sklearn' (default) or 'closed_form'
+            ...(trend_model ? { trend_model } : {}),
+            // Optional 'columns' layout: projected becomes { date: [...], predicted_sold: [...], projected_stock: [...] }
+            ...(format ? { format } : {})
         };
 
         const result = await runPythonScript('stock_prediction.py', [
@@ -313,4 +450,62 @@ router.post('/stock-prediction', protect, async (req, res) => {
     }
 });
 
+// Restock plan for a whole inventory: stockout dates, reorder points and suggested order quantities.
+// Each item is a stock-prediction payload plus optional lead_time_days, safety_stock and cover_days.
+router.post('/restock-plan', protect, async (req, res) => {
+    try {
+        const { items } = req.body || {};
+
+        if (!Array.isArray(items) || items.length === 0) {
+            return res.status(400).json({
+                success: false,
+                message: 'items must be a non-empty array'
+            });
+        }
+
+        const scopedItems = items.map(item => (item && typeof item === 'object' && item.history_id != null
+            ? { ...item, history_id: scopeHistoryId(req.user, item.history_id) }
+            : item));
+
+        const result = await runPythonScriptWithInput('stock_prediction.py', ['plan-restock'], scopedItems);
+
+        res.json(result);
+    } catch (error) {
+        console.error('Restock plan error:', error);
+        res.status(500).json({
+            success: false,
+            message: 'Error generating restock plan',
+            error: error.message
+        });
+    }
+});
+
+// Store daily sales for a product so stock predictions can reference it by history_id
+router.post('/sales-history', protect, async (req, res) => {
+    try {
+        const { history_id, sales_history } = req.body || {};
+
+        if (history_id === undefined || !sales_history) {
+            return res.status(400).json({
+                success: false,
+                message: 'history_id and sales_history are required'
+            });
+        }
+
+        const result = await runPythonScriptWithInput('stock_prediction.py', [
+            'ingest-sales',
+            scopeHistoryId(req.user, history_id)
+        ], sales_history);
+
+        res.json(result && result.success ? { ...result, history_id: String(history_id) } : result);
+    } catch (error) {
+        console.error('Sales history error:', error);
+        res.status(500).json({
+            success: false,
+            message: 'Error storing sales history',
+            error: error.message
+        });
+    }
+});
+
 export default router;
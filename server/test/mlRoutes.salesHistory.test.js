@@ -0,0 +1,84 @@
+/**
+ * Stored sales histories are private to the user who wrote them.
+ * Runs the real ML routes and stock_prediction.py against a temporary store;
+ * only the user lookup in the auth middleware is stubbed (no MongoDB needed).
+ *
+ *   npm test
+ */
+
+import { test, before, after } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import express from 'express';
+import jwt from 'jsonwebtoken';
+import User from '../models/User.js';
+
+const storeDir = fs.mkdtempSync(path.join(os.tmpdir(), 'sales-history-'));
+process.env.ML_SALES_HISTORY_DIR = storeDir;
+process.env.JWT_SECRET = process.env.JWT_SECRET || 'test-secret';
+
+const users = {
+    '64a1b2c3d4e5f6789012345a': { _id: '64a1b2c3d4e5f6789012345a', role: 'farmer', isActive: true },
+    '64a1b2c3d4e5f6789012345b': { _id: '64a1b2c3d4e5f6789012345b', role: 'consumer', isActive: true }
+};
+const [userA, userB] = Object.keys(users);
+User.findById = (id) => ({ select: () => ({ lean: async () => users[id] || null }) });
+
+let server;
+let baseUrl;
+
+before(async () => {
+    const { default: mlRoutes } = await import('../routes/mlRoutes.js');
+    const app = express();
+    app.use(express.json({ limit: '10mb' }));
+    app.use('/api/ml', mlRoutes);
+    server = app.listen(0);
+    await new Promise(resolve => server.once('listening', resolve));
+    baseUrl = `http://127.0.0.1:${server.address().port}/api/ml`;
+});
+
+after(() => {
+    server.close();
+    fs.rmSync(storeDir, { recursive: true, force: true });
+});
+
+const post = async (userId, route, body) => {
+    const token = jwt.sign({ id: userId }, process.env.JWT_SECRET, { expiresIn: '1h' });
+    const res = await fetch(`${baseUrl}${route}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
+        body: JSON.stringify(body)
+    });
+    return res.json();
+};
+
+const sales = (sold) => ({ dates: ['2025-01-01', '2025-01-02', '2025-01-03'], sold });
+const predict = (userId) => post(userId, '/stock-prediction', {
+    product_name: 'Tomatoes', current_stock: 100, days_ahead: 3, history_id: 'prod-1', trend_model: 'closed_form'
+});
+
+test('user B cannot read or overwrite user A\'s sales history', { timeout: 60000 }, async () => {
+    const stored = await post(userA, '/sales-history', { history_id: 'prod-1', sales_history: sales([5, 5, 5]) });
+    assert.equal(stored.success, true);
+    assert.equal(stored.history_id, 'prod-1');
+    const before = await predict(userA);
+    assert.equal(before.success, true);
+
+    // Reading: the same history_id names nothing for user B
+    const read = await predict(userB);
+    assert.equal(read.success, false);
+    assert.match(read.error, /No stored sales history/);
+    const plan = await post(userB, '/restock-plan', {
+        items: [{ product_name: 'Tomatoes', current_stock: 100, history_id: 'prod-1' }]
+    });
+    assert.equal(plan.results[0].success, false);
+
+    // Writing: user B's series is separate, user A's forecast is unchanged
+    const overwrite = await post(userB, '/sales-history', { history_id: 'prod-1', sales_history: sales([50, 50, 50]) });
+    assert.equal(overwrite.success, true);
+    assert.deepEqual(await predict(userA), before);
+    assert.notDeepEqual(await predict(userB), before);
+    assert.equal(fs.readdirSync(storeDir).filter(name => name.endsWith('.f8')).length, 2);
+});